@@ -0,0 +1,230 @@
+"""Pre-scaled card sprite atlas, cached on disk so startup is a single image load instead of 53 loads + smoothscales."""
+import os, hashlib, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from speed import CARD_NAMES, values
+
+SPRITE_DIR = "card sprites"
+CACHE_DIR = ".sprite_cache"
+COLUMNS = 14
+DISK_BUDGET = 16 << 20    # bytes of atlas files kept in CACHE_DIR
+# cell order in the sheet: the back first, then the faces in engine card order
+ATLAS_NAMES = ["cardback"] + CARD_NAMES
+
+
+def source_path(name):
+    """'cardback' -> card sprites/cardback.png, '1_of_spades' -> card sprites/ace_of_spades.png, etc."""
+    if name == "cardback":
+        return os.path.join(SPRITE_DIR, "cardback.png")
+    num, suit = name.split("_of_")
+    return os.path.join(SPRITE_DIR, f"{values[int(num) - 1]}_of_{suit}.png")
+
+
+def cache_key(scale):
+    """Hash of the scale and every source file's mtime/size; any change makes a new atlas file."""
+    h = hashlib.sha1(repr(scale).encode())
+    for name in ATLAS_NAMES:
+        st = os.stat(source_path(name))
+        h.update(f"{name}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return h.hexdigest()[:16]
+
+
+def build_atlas(scale):
+    """Load and smoothscale every sprite and pack them into one sheet (all the PNGs are the same size).
+       Doesn't convert to the display format, so it can run on a worker thread."""
+    scaled = []
+    for name in ATLAS_NAMES:
+        img = pygame.image.load(source_path(name))
+        w, h = img.get_size()
+        scaled.append(pygame.transform.smoothscale(img, (int(w * scale), int(h * scale))))
+    cw, ch = scaled[0].get_size()
+    rows = -(-len(scaled) // COLUMNS)
+    sheet = pygame.Surface((cw * COLUMNS, ch * rows), pygame.SRCALPHA)
+    for i, img in enumerate(scaled):
+        sheet.blit(img, ((i % COLUMNS) * cw, (i // COLUMNS) * ch))
+    return sheet
+
+
+def sheet_path(scale):
+    return os.path.join(CACHE_DIR, f"atlas_{scale}_{cache_key(scale)}.png")
+
+
+def cached_sheet(scale):
+    """The sheet for scale from the disk cache, or None. Marks the file used for prune_cache."""
+    path = sheet_path(scale)
+    try:
+        sheet = pygame.image.load(path)
+    except (FileNotFoundError, pygame.error):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return sheet
+
+
+def load_sheet(scale):
+    """The sheet for scale from the disk cache, or built and cached. Also safe on a worker thread."""
+    sheet = cached_sheet(scale)
+    if sheet is None:
+        sheet = build_atlas(scale)
+        save_sheet(sheet, scale)
+    return sheet
+
+
+def fetch_sheet(scale):
+    """(sheet, built) for AtlasCache's worker: like load_sheet, but a freshly built sheet isn't saved
+       (the cache only writes the scales the window settles on)."""
+    sheet = cached_sheet(scale)
+    if sheet is not None:
+        return sheet, False
+    return build_atlas(scale), True
+
+
+def save_sheet(sheet, scale, budget=DISK_BUDGET):
+    """Write the sheet, drop any stale atlas for this scale and prune the cache to budget bytes."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = sheet_path(scale)
+    prefix = f"atlas_{scale}_"
+    for old in os.listdir(CACHE_DIR):
+        if old.startswith(prefix) and old.endswith(".png") and ".tmp" not in old:
+            os.remove(os.path.join(CACHE_DIR, old))
+    tmp = f"{path}.{threading.get_ident()}.tmp.png"
+    pygame.image.save(sheet, tmp)
+    os.replace(tmp, path)
+    prune_cache(budget)
+
+
+def prune_cache(budget=DISK_BUDGET):
+    """Delete the least recently used atlas files until the rest fit in budget bytes (the newest
+       one always stays), like AtlasCache does in memory."""
+    files = []
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith("atlas_") and name.endswith(".png") and ".tmp" not in name:
+            try:
+                st = os.stat(os.path.join(CACHE_DIR, name))
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, name))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    for _, size, name in files[:-1]:
+        if total <= budget:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+class SpriteAtlas:
+    """Card images for one scale. Index it like the old cards dict: atlas["1_of_spades"], atlas["cardback"].
+       Each face is a subsurface of the sheet, made the first time it is asked for."""
+
+    def __init__(self, scale, sheet=None):
+        self.scale = scale
+        self.sheet = (sheet if sheet is not None else load_sheet(scale)).convert_alpha()
+        rows = -(-len(ATLAS_NAMES) // COLUMNS)
+        self.cell = (self.sheet.get_width() // COLUMNS, self.sheet.get_height() // rows)
+        self.index = {name: i for i, name in enumerate(ATLAS_NAMES)}
+        self.faces = {}
+
+    def nbytes(self):
+        sheet = self.sheet
+        return sheet.get_width() * sheet.get_height() * sheet.get_bytesize()
+
+    def __getitem__(self, name):
+        face = self.faces.get(name)
+        if face is None:
+            i = self.index[name]
+            cw, ch = self.cell
+            face = self.sheet.subsurface(((i % COLUMNS) * cw, (i // COLUMNS) * ch, cw, ch))
+            self.faces[name] = face
+        return face
+
+
+class AtlasCache:
+    """Atlases for recently used scales, least recently used dropped first once their sheets add up
+       to more than budget bytes (the newest one always stays).
+
+    request() starts building a missing scale on a worker thread and returns straight away, so the
+    frame loop keeps drawing with the scale it has; poll() takes in whatever has finished. Only the
+    latest requested scale is built: asking for another one cancels the old build (or drops its
+    result), so dragging a window edge doesn't queue up a build per step. A freshly built sheet is
+    written to the disk cache once poll() takes it in and it is still the wanted scale. notify() is
+    called from the worker when a build is done (main.py posts a pygame event to wake up)."""
+
+    def __init__(self, budget=64 << 20, notify=None):
+        self.budget = budget
+        self.notify = notify
+        self.atlases = OrderedDict()      # scale -> SpriteAtlas, least recently used first
+        self.pending = None               # (scale, future of fetch_sheet(scale)) for the latest request
+        self.failed = {}                  # scale -> exception its build raised (not retried)
+        self.pool = ThreadPoolExecutor(max_workers=1)
+
+    def add(self, atlas):
+        self.atlases[atlas.scale] = atlas
+        self.atlases.move_to_end(atlas.scale)
+        total = sum(a.nbytes() for a in self.atlases.values())
+        while total > self.budget and len(self.atlases) > 1:
+            _, old = self.atlases.popitem(last=False)
+            total -= old.nbytes()
+
+    def get(self, scale):
+        """The atlas for scale if it's ready (and mark it used), else None."""
+        atlas = self.atlases.get(scale)
+        if atlas is not None:
+            self.atlases.move_to_end(scale)
+        return atlas
+
+    def request(self, scale):
+        """get(scale), starting a background build if it isn't there yet (and dropping any other)."""
+        atlas = self.get(scale)
+        if atlas is not None or scale in self.failed:
+            return atlas
+        if self.pending is not None:
+            if self.pending[0] == scale:
+                return None
+            # a build that has already started can't be stopped; poll() won't see its result
+            self.pending[1].cancel()
+        fut = self.pool.submit(fetch_sheet, scale)
+        self.pending = (scale, fut)
+        fut.add_done_callback(self._done)
+        return None
+
+    def _done(self, fut):
+        # on the worker thread; close() clears notify so nothing is posted to a display that's gone
+        notify = self.notify
+        if notify is not None and not fut.cancelled():
+            notify()
+
+    def poll(self):
+        """Turn a finished build into an atlas (on the calling thread: converting needs the display)."""
+        if self.pending is None or not self.pending[1].done():
+            return
+        (scale, fut), self.pending = self.pending, None
+        try:
+            sheet, built = fut.result()
+        except Exception as e:
+            # missing or broken sprite files: stay on the current scale
+            self.failed[scale] = e
+            return
+        self.add(SpriteAtlas(scale, sheet))
+        if built:
+            self.pool.submit(save_sheet, sheet, scale)
+
+    def close(self):
+        self.notify = None
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    # prebuild the atlas (e.g. at install time): python atlas.py [scale]
+    import sys
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    atlas = SpriteAtlas(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3)
+    print(f"atlas for scale {atlas.scale}: {atlas.sheet.get_size()}, cell {atlas.cell}")
@@ -0,0 +1,206 @@
+"""Lockstep NumPy simulator: N headless Speed games held as arrays and advanced together.
+
+Same rules and timing as speed.play_headless (player turn, then bot turn, then the inactivity flip),
+but every step advances all unfinished games to their own next event with array ops instead of
+running one SpeedGame at a time.
+
+    python batchsim.py --games 100000
+"""
+import argparse, time
+import numpy as np
+from speed import (PLAYABLE, DECK, CARD_RANKS, PILE_SIZES, HAND_SIZE, BOT_DELAY, FPS,
+                   DEFAULT_INACTIVITY_SECONDS, CENTER_PILE_LEFT, CENTER_PILE_RIGHT, PLAYER_PILE, BOT_PILE)
+
+EMPTY = -1
+NO_WINNER, PLAYER_WINS, BOT_WINS = 0, 1, 2
+# pile rows in the piles array, in the same order as PILE_SIZES
+PILE_ORDER = list(PILE_SIZES)
+P_LEFT, P_RIGHT = PILE_ORDER.index(CENTER_PILE_LEFT), PILE_ORDER.index(CENTER_PILE_RIGHT)
+P_PLAYER, P_BOT = PILE_ORDER.index(PLAYER_PILE), PILE_ORDER.index(BOT_PILE)
+MAX_PILE = max(PILE_SIZES.values())
+
+# rank lookups padded so EMPTY (-1) maps to rank 0, which never plays
+RANK_OF = np.array([0] + CARD_RANKS, dtype=np.int8)      # RANK_OF[card + 1]
+PLAYABLE_NP = np.array(PLAYABLE, dtype=bool)             # [card rank, center rank]
+
+
+class BatchSim:
+    """n games in lockstep. Settings can be scalars or per-game arrays (handy for sweeps)."""
+
+    def __init__(self, n, bot_delay=BOT_DELAY, bot_skip=0.0, inactivity_threshold=int(DEFAULT_INACTIVITY_SECONDS * FPS),
+                 player_delay=BOT_DELAY, player_skip=0.0, seed=None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        shape = (n,)
+        self.bot_delay = np.broadcast_to(np.asarray(bot_delay, dtype=np.int64), shape)
+        self.bot_skip = np.broadcast_to(np.asarray(bot_skip, dtype=np.float64), shape)
+        self.threshold = np.broadcast_to(np.asarray(inactivity_threshold, dtype=np.int64), shape)
+        self.player_delay = np.broadcast_to(np.asarray(player_delay, dtype=np.int64), shape)
+        self.player_skip = np.broadcast_to(np.asarray(player_skip, dtype=np.float64), shape)
+        self.rows = np.arange(n)
+        self.deal()
+
+    def deal(self):
+        n, rng = self.n, self.rng
+        deck = np.tile(np.arange(len(DECK), dtype=np.int8), (n, 1))
+        cards = rng.permuted(deck, axis=1)
+        # piles[g, p, i]: pile p of game g bottom to top; counts[g, p] cards left (top = counts - 1)
+        self.piles = np.full((n, len(PILE_ORDER), MAX_PILE), EMPTY, dtype=np.int8)
+        self.counts = np.zeros((n, len(PILE_ORDER)), dtype=np.int64)
+        start = 0
+        for p, size in enumerate(PILE_SIZES.values()):
+            self.piles[:, p, :size] = cards[:, start:start + size]
+            self.counts[:, p] = size
+            start += size
+        # face up cards are the rest of the same shuffle, like SpeedGame.deal
+        self.centers = cards[:, start:start + 2].copy()
+        self.hands = cards[:, start + 2:start + 2 + 2 * HAND_SIZE].reshape(n, 2, HAND_SIZE).copy()   # [g, PLAYER/BOT, pos]
+        self.player_timer = np.zeros(n, dtype=np.int64)
+        self.bot_timer = np.zeros(n, dtype=np.int64)
+        self.inactivity = np.zeros(n, dtype=np.int64)
+        self.frames = np.zeros(n, dtype=np.int64)
+        self.winner = np.zeros(n, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+
+    # ------------------ helpers ------------------
+
+    def playable(self, hand):
+        """(left, right) bool arrays [n, 5]: which hand positions play on each center."""
+        ranks = RANK_OF[self.hands[:, hand, :] + 1]
+        left = PLAYABLE_NP[ranks, RANK_OF[self.centers[:, 0:1] + 1]]
+        right = PLAYABLE_NP[ranks, RANK_OF[self.centers[:, 1:2] + 1]]
+        return left, right
+
+    def pop(self, mask, p):
+        """Top card of pile p for the games in mask (counts must be > 0 there)."""
+        g = self.rows[mask]
+        self.counts[g, p] -= 1
+        return self.piles[g, p, self.counts[g, p]]
+
+    def play(self, mask, hand):
+        """Games in mask play a random playable card of hand (left preferred). Returns (played mask, position)."""
+        left, right = self.playable(hand)
+        ok = left | right
+        has = mask & ok.any(axis=1)
+        keys = np.where(ok, self.rng.random(ok.shape), -1.0)
+        pos = keys.argmax(axis=1)
+        g = self.rows[has]
+        p = pos[has]
+        side = np.where(left[g, p], 0, 1)
+        self.centers[g, side] = self.hands[g, hand, p]
+        self.hands[g, hand, p] = EMPTY
+        self.inactivity[has] = 0
+        return has, pos
+
+    def check_winner(self, mask):
+        """Record a winner for games in mask whose player / bot ran out of cards (player checked first)."""
+        empty = (self.hands == EMPTY).all(axis=2)
+        player = mask & empty[:, 0] & (self.counts[:, P_PLAYER] == 0)
+        bot = mask & ~player & empty[:, 1] & (self.counts[:, P_BOT] == 0)
+        self.winner[player] = PLAYER_WINS
+        self.winner[bot] = BOT_WINS
+        self.done |= player | bot
+
+    def check_stalled(self, mask):
+        """Games where nothing can change any more: no center flips, no draws, no moves."""
+        stalled = mask & ~((self.counts[:, P_LEFT] > 0) & (self.counts[:, P_RIGHT] > 0))
+        for hand, p in ((0, P_PLAYER), (1, P_BOT)):
+            can_draw = (self.hands[:, hand, :] == EMPTY).any(axis=1) & (self.counts[:, p] > 0)
+            left, right = self.playable(hand)
+            stalled &= ~can_draw & ~(left | right).any(axis=1)
+        self.done |= stalled
+
+    # ------------------ turns ------------------
+
+    def player_turn(self, mask):
+        """Headless stand-in player: play a card, else fill empty slots from pile 9 (SpeedGame.player_take_turn)."""
+        played, _ = self.play(mask, 0)
+        draw = mask & ~played
+        for pos in range(HAND_SIZE):
+            m = draw & (self.hands[:, 0, pos] == EMPTY) & (self.counts[:, P_PLAYER] > 0)
+            if m.any():
+                self.hands[m, 0, pos] = self.pop(m, P_PLAYER)
+
+    def bot_turn(self, mask):
+        """SpeedGame.bot_take_turn: play and refill that slot, else draw into the first empty slot."""
+        played, pos = self.play(mask, 1)
+        refill = played & (self.counts[:, P_BOT] > 0)
+        if refill.any():
+            self.hands[refill, 1, pos[refill]] = self.pop(refill, P_BOT)
+        empty = self.hands[:, 1, :] == EMPTY
+        draw = mask & ~played & empty.any(axis=1) & (self.counts[:, P_BOT] > 0)
+        if draw.any():
+            self.hands[draw, 1, empty[draw].argmax(axis=1)] = self.pop(draw, P_BOT)
+
+    def flip(self, mask):
+        """SpeedGame.flip_new_center_cards: both center piles flip together; once either is empty both are dropped."""
+        both = mask & (self.counts[:, P_LEFT] > 0) & (self.counts[:, P_RIGHT] > 0)
+        if both.any():
+            self.centers[both, 0] = self.pop(both, P_LEFT)
+            self.centers[both, 1] = self.pop(both, P_RIGHT)
+        drop = mask & ((self.counts[:, P_LEFT] == 0) | (self.counts[:, P_RIGHT] == 0))
+        self.counts[drop, P_LEFT] = 0
+        self.counts[drop, P_RIGHT] = 0
+
+    def step(self):
+        """Advance every unfinished game to the next frame where something happens in it."""
+        live = ~self.done
+        step = np.minimum(np.minimum(self.player_delay - self.player_timer, self.bot_delay - self.bot_timer),
+                          self.threshold - self.inactivity)
+        step = np.where(live, np.maximum(step, 1), 0)
+        self.frames += step
+        self.player_timer += step
+        self.bot_timer += step
+        self.inactivity += np.maximum(step - 1, 0)
+
+        fire = live & (self.player_timer >= self.player_delay)
+        self.player_timer[fire] = 0
+        act = fire & ((self.player_skip == 0) | (self.rng.random(self.n) >= self.player_skip))
+        self.player_turn(act)
+        self.check_winner(act)
+
+        live &= ~self.done
+        fire = live & (self.bot_timer >= self.bot_delay)
+        self.bot_timer[fire] = 0
+        act = fire & ((self.bot_skip == 0) | (self.rng.random(self.n) >= self.bot_skip))
+        self.bot_turn(act)
+        self.inactivity[live] += 1
+        flip = live & (self.inactivity >= self.threshold)
+        self.flip(flip)
+        self.inactivity[flip] = 0
+        self.check_winner(live)
+        self.check_stalled(live & ~self.done)
+
+    def run(self, max_frames=FPS * 60 * 10):
+        """Step until every game finished (or hit max_frames). Returns (winner, frames) arrays."""
+        while not self.done.all():
+            self.step()
+            self.done |= self.frames >= max_frames
+        return self.winner, self.frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy batch Speed simulator")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--bot-delay", type=int, default=BOT_DELAY)
+    parser.add_argument("--bot-skip", type=float, default=0.0)
+    parser.add_argument("--player-delay", type=int, default=BOT_DELAY)
+    parser.add_argument("--player-skip", type=float, default=0.0)
+    parser.add_argument("--inactivity", type=float, default=DEFAULT_INACTIVITY_SECONDS, help="seconds")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sim = BatchSim(args.games, bot_delay=args.bot_delay, bot_skip=args.bot_skip,
+                   inactivity_threshold=int(args.inactivity * FPS),
+                   player_delay=args.player_delay, player_skip=args.player_skip, seed=args.seed)
+    winner, frames = sim.run()
+    elapsed = time.perf_counter() - start
+    decided = winner != NO_WINNER
+    print(f"player wins {np.mean(winner == PLAYER_WINS):.3f}  bot wins {np.mean(winner == BOT_WINS):.3f}  "
+          f"stalled {np.mean(~decided):.3f}  mean length {frames[decided].mean() / FPS if decided.any() else 0:.1f}s")
+    print(f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.0f} games/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Benchmarks for the hot paths, run headless under SDL's dummy video driver.
+
+    python bench.py                         # run and compare against bench_baseline.json if it exists
+    python bench.py --save                  # run and store the results as the new baseline
+    python bench.py --threshold 0.25        # fail if anything got more than 25% slower
+
+Exits with status 1 when a benchmark regressed past the threshold.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse, gc, json, platform, random, statistics, sys, time
+import pygame
+from speed import SpeedGame, Layout, CLASSIC
+from atlas import SpriteAtlas
+from render import Renderer
+from view import TableView, make_sprite, cardPos, table_positions
+from spatial import SpatialGrid
+from snapshot import snapshot, restore
+
+BASELINE = "bench_baseline.json"
+WIDTH, HEIGHT = 1075, 800
+SCALE = 0.3
+BG = (0, 60, 0)
+RENDER_SIZES = (16, 64, 256)    # sprites on the table for the render benchmarks
+MIN_SAMPLE = 0.05               # seconds of timed calls per sample
+ENGINE_LAYOUTS = {"": CLASSIC, "[4 seats]": Layout(4, 2, 4)}   # tables the engine benchmarks run on
+
+
+def measure(fn, make_states, repeat, min_time=MIN_SAMPLE):
+    """Seconds per call of fn(state) over the states make_states() returns, timeit-style: each of the
+       `repeat` samples keeps running fresh batches until it has min_time of timed calls, and the
+       per-call times are amortized over all of them. Returns (best, median) over the samples.
+       States are made outside the timed region, so mutating calls get a fresh one each time."""
+    samples = []
+    for _ in range(repeat):
+        elapsed = calls = 0
+        while elapsed < min_time:
+            states = make_states()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for st in states:
+                    fn(st)
+                elapsed += time.perf_counter() - start
+            finally:
+                gc.enable()
+            calls += len(states)
+        samples.append(elapsed / calls)
+    return min(samples), statistics.median(samples)
+
+
+def dealt_games(n, seed=0, layout=CLASSIC):
+    rng = random.Random(seed)
+    return [SpeedGame(rng=random.Random(rng.random()), layout=layout) for _ in range(n)]
+
+
+def scattered_sprites(cards, n, seed=0):
+    """n face-up sprites spread over the screen, like a crowded table."""
+    rng = random.Random(seed)
+    names = [name for name in cards.index if name != "cardback"]
+    sprites = []
+    for i in range(n):
+        pos = (rng.randrange(0, WIDTH - cards.cell[0]), rng.randrange(0, HEIGHT - cards.cell[1]))
+        sprites.append(make_sprite(cards[names[i % len(names)]], pos))
+    return sprites
+
+
+def run_benchmarks(n, repeat):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    cards = SpriteAtlas(SCALE)
+    results = {}
+
+    def deal(seed):
+        game = SpeedGame(rng=random.Random(seed))
+        TableView(game, cards, cardPos).sync()
+    results["deal"] = measure(deal, lambda: range(n), repeat)
+    # the engine on the classic table and on a crowded one (more hands to scan, more centers to play on)
+    for suffix, layout in ENGINE_LAYOUTS.items():
+        pool = dealt_games(n, layout=layout)
+        if suffix:
+            results["deal_engine" + suffix] = measure(lambda seed: SpeedGame(rng=random.Random(seed), layout=layout),
+                                                      lambda: range(n), repeat)
+        results["bot_take_turn" + suffix] = measure(SpeedGame.bot_take_turn, lambda: [g.clone(random.Random(0)) for g in pool], repeat)
+        results["check_winner" + suffix] = measure(SpeedGame.winner, lambda: pool * 10, repeat)
+        results["flip_new_center_cards" + suffix] = measure(SpeedGame.flip_new_center_cards, lambda: [g.clone() for g in pool], repeat)
+        results["snapshot" + suffix] = measure(snapshot, lambda: pool, repeat)
+        results["restore" + suffix] = measure(restore, lambda: [snapshot(g) for g in pool], repeat)
+    pool = dealt_games(n)
+    results["view_sync"] = measure(lambda v: v.sync(), lambda: [TableView(g, cards, cardPos) for g in pool[:200]], repeat)
+
+    # what a click in the game runs: the view's grid lookup over a dealt table
+    rng = random.Random(1)
+    clicks = [(rng.randrange(WIDTH), rng.randrange(HEIGHT)) for _ in range(n)]
+    for suffix, layout in ENGINE_LAYOUTS.items():
+        view = TableView(dealt_games(1, layout=layout)[0], cards, table_positions(layout, cards.cell, WIDTH, HEIGHT))
+        view.sync()
+        results["view_sprite_at" + suffix] = measure(view.sprite_at, lambda: clicks, repeat)
+
+    frames = max(n // 20, 20)
+    for size in RENDER_SIZES:
+        sprites = scattered_sprites(cards, size)
+        renderer = Renderer(screen, BG)
+        renderer.present(sprites)
+
+        def full_frame(_):
+            renderer.invalidate()
+            renderer.present(sprites)
+        results[f"render_full[{size}]"] = measure(full_frame, lambda: range(frames), repeat)
+
+        # one card being dragged across the table, everything else still
+        dragged = sprites[-1]
+        def drag_frame(i):
+            dragged["rect"].x = (i * 7) % (WIDTH - dragged["rect"].w)
+            renderer.present(sprites)
+        results[f"render_drag[{size}]"] = measure(drag_frame, lambda: range(frames), repeat)
+
+        # the same, told that only the dragged card moved (what main.py does between table changes)
+        def drag_moved_frame(i):
+            dragged["rect"].x = (i * 7) % (WIDTH - dragged["rect"].w)
+            renderer.present(sprites, moved=dragged)
+        results[f"render_drag_moved[{size}]"] = measure(drag_moved_frame, lambda: range(frames), repeat)
+
+        # clicking on the table: walking every sprite top-down vs the spatial grid
+        rng = random.Random(size)
+        clicks = [(rng.randrange(WIDTH), rng.randrange(HEIGHT)) for _ in range(n)]
+        def scan(pos):
+            for s in reversed(sprites):
+                if s["rect"].collidepoint(pos):
+                    return s
+        grid = SpatialGrid(cards.cell[1])
+        for i, s in enumerate(sprites):
+            grid.insert(i, s["rect"])
+        # the same lookup TableView.sprite_at does: the grid cell's items, topmost first
+        def grid_hit(pos):
+            for i in reversed(grid.at(pos)):
+                return sprites[i]
+        results[f"hit_scan[{size}]"] = measure(scan, lambda: clicks, repeat)
+        results[f"hit_grid[{size}]"] = measure(grid_hit, lambda: clicks, repeat)
+    pygame.quit()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print each benchmark against the baseline; returns the names that regressed past threshold.
+       Best times are compared (the least disturbed by whatever else the machine was doing)."""
+    regressed = []
+    for name, (best, median) in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:>32} {best * 1e6:10.3f} us  median {median * 1e6:10.3f}   (new)")
+            continue
+        base = base[0] if isinstance(base, list) else base
+        change = best / base - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSED"
+            regressed.append(name)
+        print(f"{name:>32} {best * 1e6:10.3f} us  median {median * 1e6:10.3f}   baseline {base * 1e6:10.3f} us   {change:+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speed hot-path benchmarks")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file (default %(default)s)")
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("-n", type=int, default=2000, help="calls per batch of states")
+    parser.add_argument("--repeat", type=int, default=9, help="samples per benchmark (best and median are kept)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.n, args.repeat)
+    regressed = []
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f)["results"], args.threshold)
+    else:
+        for name, (best, median) in results.items():
+            print(f"{name:>32} {best * 1e6:10.3f} us  median {median * 1e6:10.3f}")
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "pygame": pygame.version.ver,
+                       "machine": platform.machine(), "results": results}, f, indent=2)
+        print(f"saved baseline to {args.baseline}")
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
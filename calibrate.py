@@ -0,0 +1,109 @@
+"""Difficulty calibration: play big batches of headless games across all cores and report win rates / game lengths.
+
+    python calibrate.py --games 100000 --bot-delay 45 90 180 --bot-skip 0 0.5 --inactivity 2.5
+"""
+import argparse, itertools, json, math, os, random, time
+from concurrent.futures import ProcessPoolExecutor
+from speed import SpeedGame, play_headless, FPS, DEFAULT_INACTIVITY_SECONDS, DIFFICULTIES
+
+Z95 = 1.96
+
+
+def run_batch(bot_delay, bot_skip, inactivity, player_delay, player_skip, seed, games):
+    """Play games with one config. Returns raw tallies so batches can just be summed."""
+    rng = random.Random(seed)
+    threshold = int(inactivity * FPS)
+    player = bot = stalled = 0
+    frames = frames_sq = 0
+    for _ in range(games):
+        game = SpeedGame(bot_delay=bot_delay, bot_skip=bot_skip, inactivity_threshold=threshold, rng=rng)
+        winner, n = play_headless(game, player_delay=player_delay, player_skip=player_skip)
+        if winner is None:
+            stalled += 1
+            continue
+        if winner == "player":
+            player += 1
+        else:
+            bot += 1
+        frames += n
+        frames_sq += n * n
+    return [player, bot, stalled, frames, frames_sq]
+
+
+def proportion_ci(k, n):
+    """Wilson score interval for k successes out of n."""
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    p = k / n
+    denom = 1 + Z95 ** 2 / n
+    center = (p + Z95 ** 2 / (2 * n)) / denom
+    half = Z95 * math.sqrt(p * (1 - p) / n + Z95 ** 2 / (4 * n * n)) / denom
+    return p, center - half, center + half
+
+
+def summarize(config, tallies):
+    player, bot, stalled, frames, frames_sq = tallies
+    total = player + bot + stalled
+    decided = player + bot
+    bot_rate, bot_lo, bot_hi = proportion_ci(bot, total)
+    mean = frames / decided if decided else 0.0
+    var = max(frames_sq / decided - mean * mean, 0.0) if decided else 0.0
+    half = Z95 * math.sqrt(var / decided) if decided else 0.0
+    return dict(config, games=total, player_wins=player, bot_wins=bot, stalled=stalled,
+                bot_win_rate=bot_rate, bot_win_ci=[bot_lo, bot_hi],
+                player_win_rate=player / total if total else 0.0,
+                stall_rate=stalled / total if total else 0.0,
+                mean_seconds=mean / FPS, mean_seconds_ci=[(mean - half) / FPS, (mean + half) / FPS])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20000, help="games per config")
+    parser.add_argument("--bot-delay", type=int, nargs="+", default=sorted({d for d, _ in DIFFICULTIES.values()}),
+                        help="bot delays to sweep (frames at %d FPS)" % FPS)
+    parser.add_argument("--bot-skip", type=float, nargs="+", default=sorted({s for _, s in DIFFICULTIES.values()}),
+                        help="bot skip probabilities to sweep")
+    parser.add_argument("--inactivity", type=float, nargs="+", default=[DEFAULT_INACTIVITY_SECONDS],
+                        help="inactivity timeouts to sweep (seconds)")
+    parser.add_argument("--player-delay", type=int, default=90, help="reference player's delay (frames)")
+    parser.add_argument("--player-skip", type=float, default=0.0, help="reference player's skip probability")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=2000, help="games per worker task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    configs = [dict(bot_delay=d, bot_skip=s, inactivity=i)
+               for d, s, i in itertools.product(args.bot_delay, args.bot_skip, args.inactivity)]
+    start = time.perf_counter()
+    tallies = [[0] * 5 for _ in configs]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {}
+        for ci, cfg in enumerate(configs):
+            for chunk_start in range(0, args.games, args.chunk):
+                n = min(args.chunk, args.games - chunk_start)
+                # every chunk gets its own seed so runs are reproducible regardless of worker count
+                seed = hash((args.seed, ci, chunk_start)) & 0xFFFFFFFF
+                fut = pool.submit(run_batch, cfg["bot_delay"], cfg["bot_skip"], cfg["inactivity"],
+                                  args.player_delay, args.player_skip, seed, n)
+                futures[fut] = ci
+        for fut, ci in futures.items():
+            tallies[ci] = [a + b for a, b in zip(tallies[ci], fut.result())]
+    elapsed = time.perf_counter() - start
+
+    results = [summarize(cfg, t) for cfg, t in zip(configs, tallies)]
+    print(f"{'delay':>6} {'skip':>5} {'idle s':>6} | {'bot win':>8} {'95% CI':>17} | {'stall':>6} | {'mean len s':>10} {'95% CI':>17}")
+    for r in results:
+        print(f"{r['bot_delay']:>6} {r['bot_skip']:>5.2f} {r['inactivity']:>6.2f} | "
+              f"{r['bot_win_rate']:>8.3f} [{r['bot_win_ci'][0]:.3f}, {r['bot_win_ci'][1]:.3f}] | "
+              f"{r['stall_rate']:>6.3f} | "
+              f"{r['mean_seconds']:>10.1f} [{r['mean_seconds_ci'][0]:6.1f}, {r['mean_seconds_ci'][1]:6.1f}]")
+    total = args.games * len(configs)
+    print(f"{total} games in {elapsed:.1f}s ({total / elapsed:.0f} games/s, {args.workers} workers)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"player_delay": args.player_delay, "player_skip": args.player_skip, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Deal analysis and a pool of fair deals ready to play.
+
+The solver looks at one side at a time, playing alone against the centers: every play refills the
+hand from its pile, and the center piles can be flipped at any point. It is a memoized depth-first
+search over (hand ranks, cards drawn, center ranks, flips used); suits and slot order don't matter,
+so many lines of play meet in the same state. The result is the fewest plays + flips that empty the
+side's hand and pile, or inf if it can't be done without help from the other side's plays.
+
+A deal is fair when both sides can win alone and need about the same number of moves. DealPool keeps
+the seeds of fair deals in a file and tops it up from a solver process, so starting a game takes
+one straight away. Seeds are all a deal needs: SpeedGame(rng=random.Random(seed)) re-deals it.
+
+    python dealer.py --deals 200          # winnability / balance stats over random deals
+    python dealer.py --fill 50            # top up the pool file
+"""
+import argparse, json, math, os, random, threading, time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from speed import (SpeedGame, PLAYABLE, CARD_RANKS, PLAY_LEFT, PLAY_RIGHT, CENTER_PILE_LEFT, CENTER_PILE_RIGHT,
+                   PLAYER_HAND, PLAYER_PILE, BOT_HAND, BOT_PILE)
+
+POOL_FILE = ".deal_pool.json"
+POOL_SIZE = 50            # fair deals kept on hand
+FAIR_MARGIN = 1           # most the two sides' move counts may differ by
+SOLVER_BUDGET = 100000    # states per side before the solver gives up on a deal
+
+
+class Budget(Exception):
+    pass
+
+
+def solve_side(hand, pile, centers, flips, budget=SOLVER_BUDGET):
+    """Fewest moves (plays and flips) for one side to get rid of hand and pile, inf if it can't,
+       None if the search ran past `budget` states. hand: ranks; pile: ranks in draw order;
+       centers: the two center ranks; flips: (rank, rank) each center flip turns up, in order."""
+    memo = {}
+    size = len(pile)
+    flips = [tuple(sorted(f)) for f in flips]
+
+    def best(hand, drawn, centers, flipped):
+        left = len(hand) + size - drawn
+        if not left:
+            return 0
+        key = (hand, drawn, centers, flipped)
+        found = memo.get(key)
+        if found is not None:
+            return found
+        if len(memo) >= budget:
+            raise Budget
+        result = math.inf
+        low, high = centers
+        for i, rank in enumerate(hand):
+            if i and hand[i - 1] == rank:
+                continue
+            for center, other in ((low, high), (high, low)) if low != high else ((low, high),):
+                if not PLAYABLE[rank][center]:
+                    continue
+                rest = hand[:i] + hand[i + 1:]
+                if drawn < size:
+                    rest = tuple(sorted(rest + (pile[drawn],)))
+                moves = 1 + best(rest, drawn + (drawn < size), (rank, other) if rank < other else (other, rank), flipped)
+                if moves < result:
+                    result = moves
+                    # every card needs one play, so this can't be beaten
+                    if result == left:
+                        memo[key] = result
+                        return result
+        if flipped < len(flips):
+            result = min(result, 1 + best(hand, drawn, flips[flipped], flipped + 1))
+        memo[key] = result
+        return result
+
+    try:
+        return best(tuple(sorted(hand)), 0, tuple(sorted(centers)), 0)
+    except Budget:
+        return None
+
+
+def analyze(game, budget=SOLVER_BUDGET):
+    """{"player": moves, "bot": moves} for a classic table (see solve_side)."""
+    board, piles = game.board, game.piles
+    ranks = lambda cards: [CARD_RANKS[c] for c in cards]
+    centers = ranks((board[PLAY_LEFT], board[PLAY_RIGHT]))
+    flips = list(zip(ranks(reversed(piles[CENTER_PILE_LEFT])), ranks(reversed(piles[CENTER_PILE_RIGHT]))))
+    result = {}
+    for side, hand, pile in (("player", PLAYER_HAND, PLAYER_PILE), ("bot", BOT_HAND, BOT_PILE)):
+        result[side] = solve_side(ranks(board[s] for s in hand), ranks(reversed(piles[pile])), centers, flips, budget)
+    return result
+
+
+def is_fair(analysis, margin=FAIR_MARGIN):
+    player, bot = analysis["player"], analysis["bot"]
+    if player is None or bot is None or math.isinf(player) or math.isinf(bot):
+        return False
+    return abs(player - bot) <= margin
+
+
+def analyze_seed(seed, budget=SOLVER_BUDGET):
+    return analyze(SpeedGame(rng=random.Random(seed)), budget)
+
+
+def find_fair_deal(rng, margin=FAIR_MARGIN, budget=SOLVER_BUDGET):
+    """(seed, analysis) of the first fair deal among random seeds."""
+    while True:
+        seed = rng.randrange(1 << 63)
+        analysis = analyze_seed(seed, budget)
+        if is_fair(analysis, margin):
+            return seed, analysis
+
+
+def fair_deals(seeds, margin=FAIR_MARGIN, budget=SOLVER_BUDGET):
+    """[(seed, analysis)] for the fair deals among seeds. One job for DealPool's solver process."""
+    found = []
+    for seed in seeds:
+        analysis = analyze_seed(seed, budget)
+        if is_fair(analysis, margin):
+            found.append((seed, analysis))
+    return found
+
+
+class DealPool:
+    """Seeds of pre-analyzed fair deals, saved in a JSON file. take() pops one (None if the pool is
+       empty); start() tops the pool back up to `size` in a forked process, so the solver never
+       competes with the game for the GIL (on a worker thread where fork isn't available). The
+       solver gets `batch` seeds per job."""
+
+    def __init__(self, path=POOL_FILE, size=POOL_SIZE, margin=FAIR_MARGIN, batch=8):
+        self.path = path
+        self.size = size
+        self.margin = margin
+        self.batch = batch
+        self.lock = threading.Lock()
+        self.executor = None
+        self.rng = random.Random()
+        try:
+            with open(path) as f:
+                self.deals = json.load(f)
+        except (OSError, ValueError):
+            self.deals = []
+
+    def __len__(self):
+        return len(self.deals)
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.deals)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def take(self):
+        """A {"seed", "player", "bot"} dict, removed from the pool (and the file)."""
+        with self.lock:
+            deal = self.deals.pop() if self.deals else None
+        if deal is not None:
+            self.save()
+        return deal
+
+    def add(self, found):
+        """Put (seed, analysis) pairs in the pool, up to its size. True once it's full."""
+        with self.lock:
+            for seed, analysis in found[:max(self.size - len(self.deals), 0)]:
+                self.deals.append(dict(seed=seed, **analysis))
+            full = len(self.deals) >= self.size
+        if found:
+            self.save()
+        return full
+
+    def fill(self, rng=None):
+        """Analyze random deals in this process until the pool is full."""
+        rng = rng or random.Random()
+        while len(self.deals) < self.size:
+            self.add([find_fair_deal(rng, self.margin)])
+
+    def start(self):
+        if self.executor is None and len(self.deals) < self.size:
+            if "fork" in multiprocessing.get_all_start_methods():
+                self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork"))
+            else:
+                # a spawned worker re-runs the __main__ script, which for main.py is the whole game,
+                # so without fork (Windows) the solver gets a thread instead
+                self.executor = ThreadPoolExecutor(max_workers=1)
+            self._submit(self.executor)
+
+    def _submit(self, executor):
+        seeds = [self.rng.randrange(1 << 63) for _ in range(self.batch)]
+        try:
+            future = executor.submit(fair_deals, seeds, self.margin)
+        except RuntimeError:
+            return   # stop() shut it down in the meantime
+        future.add_done_callback(lambda fut: self._collect(executor, fut))
+
+    def _collect(self, executor, fut):
+        # runs on the executor's management thread
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        if not self.add(fut.result()) and executor is self.executor:
+            self._submit(executor)
+
+    def stop(self):
+        """Stop topping up without waiting: queued jobs are cancelled and the job the solver process
+           is on (one batch, well under a second) finishes in the background."""
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze Speed deals and keep a pool of fair ones")
+    parser.add_argument("--deals", type=int, default=200, help="random deals to analyze")
+    parser.add_argument("--fill", type=int, metavar="N", help="top up the pool file to N fair deals instead")
+    parser.add_argument("--margin", type=int, default=FAIR_MARGIN)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.fill:
+        pool = DealPool(size=args.fill, margin=args.margin)
+        start = time.perf_counter()
+        before = len(pool)
+        pool.fill(random.Random(args.seed))
+        print(f"{POOL_FILE}: {len(pool)} fair deals ({len(pool) - before} new in {time.perf_counter() - start:.1f}s)")
+        return
+
+    rng = random.Random(args.seed)
+    counts = dict(both=0, player=0, bot=0, neither=0, unknown=0, fair=0)
+    gaps = []
+    start = time.perf_counter()
+    for _ in range(args.deals):
+        analysis = analyze_seed(rng.randrange(1 << 63))
+        player, bot = analysis["player"], analysis["bot"]
+        if player is None or bot is None:
+            counts["unknown"] += 1
+            continue
+        wins = (not math.isinf(player), not math.isinf(bot))
+        counts[{(True, True): "both", (True, False): "player", (False, True): "bot", (False, False): "neither"}[wins]] += 1
+        if all(wins):
+            gaps.append(abs(player - bot))
+        counts["fair"] += is_fair(analysis, args.margin)
+    elapsed = time.perf_counter() - start
+    print(f"{args.deals} deals in {elapsed:.1f}s ({elapsed / args.deals * 1000:.0f} ms each)")
+    print("winnable alone: " + ", ".join(f"{k} {v}" for k, v in counts.items() if k != "fair"))
+    if gaps:
+        print(f"move gap when both can win: mean {sum(gaps) / len(gaps):.1f}, max {max(gaps)}")
+    print(f"fair (gap <= {args.margin}): {counts['fair']} ({counts['fair'] / args.deals:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Gym-style environment for training Speed bots: the agent plays the player seat against the engine's bot.
+
+    env = SpeedEnv(difficulty="medium")
+    obs, info = env.reset(seed=0)
+    obs, reward, terminated, truncated, info = env.step(action)
+
+Observation (OBS_SIZE float32s): the two center ranks, the ranks in the agent's five hand slots
+(0 = empty), card counts of the agent's pile, the opponent's pile and the two center piles, and the
+number of cards in the opponent's hand. Ranks are 1-13.
+
+Actions (NUM_ACTIONS): hand slot * 2 + side plays that slot's card on the left (0) or right (1)
+center, DRAW fills the empty hand slots from the pile. An illegal action is a pass. The agent acts
+every `agent_delay` frames; in between the bot moves and inactivity flips run at their normal pace.
+Reward is +1 for a win, -1 for a loss, 0 otherwise (a stalled table ends the episode at 0).
+
+VecEnv steps many of these in worker processes. Actions, observations, rewards, done flags and legal
+action masks live in shared memory, so a batch step is one small message per worker each way.
+
+    python env.py --envs 256 --workers 8 --steps 2000     # batch-step throughput
+"""
+import argparse, os, random, time
+import multiprocessing as mp
+import numpy as np
+from speed import (SpeedGame, DIFFICULTIES, PLAYABLE, CARD_RANKS, BOT_DELAY, FPS, EMPTY, PLAYER, BOT,
+                   PLAYER_HAND, PLAYER_PILE, BOT_PILE, CENTER_PILE_LEFT, CENTER_PILE_RIGHT,
+                   PLAY_LEFT, PLAY_RIGHT, FULL_HAND)
+
+OBS_SIZE = 12
+NUM_ACTIONS = 2 * len(PLAYER_HAND) + 1
+DRAW = NUM_ACTIONS - 1
+MAX_FRAMES = FPS * 60 * 10
+OBS_PILES = (PLAYER_PILE, BOT_PILE, CENTER_PILE_LEFT, CENTER_PILE_RIGHT)
+# PLAYABLE_ON[center rank][card rank]
+PLAYABLE_ON = [[PLAYABLE[a][b] for a in range(14)] for b in range(14)]
+
+
+class SpeedEnv:
+    """One classic table, agent in the player seat, engine bot at `difficulty` speed opposite."""
+
+    def __init__(self, difficulty="medium", agent_delay=BOT_DELAY, max_frames=MAX_FRAMES, seed=None):
+        self.difficulty = difficulty
+        self.agent_delay = agent_delay
+        self.max_frames = max_frames
+        self.rng = random.Random(seed)
+        self.game = None
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = random.Random(seed)
+        bot_delay, bot_skip = DIFFICULTIES[self.difficulty]
+        self.game = SpeedGame(bot_delay=bot_delay, bot_skip=bot_skip, rng=random.Random(self.rng.random()))
+        return self.observe(), {}
+
+    def observe(self, out=None):
+        """The observation vector, written into out (an OBS_SIZE float32 array) if given."""
+        game = self.game
+        board, piles = game.board, game.piles
+        if out is None:
+            out = np.empty(OBS_SIZE, dtype=np.float32)
+        # one assignment into the array; element-wise numpy writes cost more than building the list
+        out[:] = [CARD_RANKS[board[PLAY_LEFT]], CARD_RANKS[board[PLAY_RIGHT]],
+                  *[CARD_RANKS[board[slot]] if board[slot] != EMPTY else 0 for slot in PLAYER_HAND],
+                  *[len(piles[pile]) for pile in OBS_PILES], game.occupied[BOT].bit_count()]
+        return out
+
+    def legal_actions(self, out=None):
+        """Bool mask over the actions that would do something right now."""
+        game = self.game
+        board = game.board
+        if out is None:
+            out = np.empty(NUM_ACTIONS, dtype=bool)
+        left, right = PLAYABLE_ON[CARD_RANKS[board[PLAY_LEFT]]], PLAYABLE_ON[CARD_RANKS[board[PLAY_RIGHT]]]
+        mask = []
+        for slot in PLAYER_HAND:
+            card = board[slot]
+            rank = CARD_RANKS[card] if card != EMPTY else 0
+            mask += (left[rank], right[rank])
+        mask.append(bool(game.piles[PLAYER_PILE]) and game.occupied[PLAYER] != FULL_HAND)
+        out[:] = mask
+        return out
+
+    def step(self, action):
+        reward, terminated, truncated, legal = self.act(action)
+        return self.observe(), reward, terminated, truncated, {"legal": legal}
+
+    def act(self, action):
+        """step() without building the observation: (reward, terminated, truncated, legal)."""
+        game = self.game
+        if action == DRAW:
+            legal = game.draw_new_cards()
+        else:
+            legal = game.play_card(PLAYER_HAND[action >> 1], action & 1)
+        if not game.winner():
+            self.advance()
+        winner = game.winner()
+        if winner:
+            return (1.0 if winner == "player" else -1.0), True, False, legal
+        if game.is_stalled():
+            return 0.0, True, False, legal
+        return 0.0, False, game.frame >= self.max_frames, legal
+
+    def advance(self):
+        """Run the bot and the inactivity flips up to the agent's next turn, skipping the frames where
+           nothing happens (same bookkeeping as speed.AutoMatch)."""
+        game = self.game
+        left = self.agent_delay
+        while left > 0:
+            step = max(min(left, game.bot_delay - game.bot_timer, game.inactivity_threshold - game.inactivity_timer), 1)
+            game.frame += step - 1
+            game.bot_timer += step - 1
+            game.inactivity_timer += step - 1
+            game.tick()
+            left -= step
+            if game.winner():
+                return
+
+
+def _worker(conn, start, stop, n, shared, env_kwargs, seed):
+    """Owns envs start..stop of a VecEnv and steps them whenever the parent says so."""
+    obs, rewards, terminated, truncated, masks, actions = _views(shared, n)
+    envs = [SpeedEnv(**env_kwargs) for _ in range(start, stop)]
+    try:
+        while True:
+            cmd = conn.recv()
+            if cmd == "step":
+                for i, env in enumerate(envs, start):
+                    reward, term, trunc, _ = env.act(int(actions[i]))
+                    rewards[i], terminated[i], truncated[i] = reward, term, trunc
+                    # finished games are re-dealt straight away; obs is the new game's first one
+                    if term or trunc:
+                        env.reset()
+                    env.observe(obs[i])
+                    env.legal_actions(masks[i])
+            elif cmd == "reset":
+                for i, env in enumerate(envs, start):
+                    env.reset(None if seed is None else seed + i)
+                    env.observe(obs[i])
+                    env.legal_actions(masks[i])
+            else:
+                return
+            conn.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+
+
+def _views(shared, n):
+    obs, rewards, terminated, truncated, masks, actions = shared
+    return (np.frombuffer(obs, dtype=np.float32).reshape(n, OBS_SIZE), np.frombuffer(rewards, dtype=np.float32),
+            np.frombuffer(terminated, dtype=bool), np.frombuffer(truncated, dtype=bool),
+            np.frombuffer(masks, dtype=bool).reshape(n, NUM_ACTIONS), np.frombuffer(actions, dtype=np.int64))
+
+
+class VecEnv:
+    """n SpeedEnvs split over `workers` processes and stepped together. step() takes an array of n
+       actions and returns (obs, rewards, terminated, truncated, legal_masks) as arrays; finished
+       environments are reset automatically, so their obs row already belongs to the next game."""
+
+    def __init__(self, n, workers=None, seed=None, **env_kwargs):
+        self.n = n
+        workers = max(1, min(workers or os.cpu_count() or 1, n))
+        self.shared = (mp.RawArray("b", n * OBS_SIZE * 4), mp.RawArray("b", n * 4), mp.RawArray("b", n),
+                       mp.RawArray("b", n), mp.RawArray("b", n * NUM_ACTIONS), mp.RawArray("b", n * 8))
+        self.obs, self.rewards, self.terminated, self.truncated, self.masks, self.actions = _views(self.shared, n)
+        self.conns, self.procs = [], []
+        bounds = [n * w // workers for w in range(workers + 1)]
+        for start, stop in zip(bounds, bounds[1:]):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=_worker, args=(child, start, stop, n, self.shared, env_kwargs, seed), daemon=True)
+            proc.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(proc)
+
+    def _run(self, cmd):
+        for conn in self.conns:
+            conn.send(cmd)
+        for conn in self.conns:
+            conn.recv()
+
+    def reset(self):
+        """(obs, legal_masks) for freshly dealt tables."""
+        self._run("reset")
+        return self.obs.copy(), self.masks.copy()
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._run("step")
+        return self.obs.copy(), self.rewards.copy(), self.terminated.copy(), self.truncated.copy(), self.masks.copy()
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send("close")
+            except OSError:
+                pass
+        for proc in self.procs:
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def random_legal(masks, rng):
+    """One uniformly random legal action per row (DRAW where nothing is legal)."""
+    scores = rng.random(masks.shape) * masks
+    actions = scores.argmax(axis=1)
+    actions[~masks.any(axis=1)] = DRAW
+    return actions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-step throughput of the Speed training environment")
+    parser.add_argument("--envs", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--steps", type=int, default=1000, help="batch steps to time")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default="medium")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    env = SpeedEnv(args.difficulty)
+    env.reset(seed=args.seed)
+    steps = max(args.steps, 1000)
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, term, trunc, _ = env.step(int(random_legal(env.legal_actions()[None], rng)[0]))
+        if term or trunc:
+            env.reset()
+    single = steps / (time.perf_counter() - start)
+    print(f"single env:        {single:>10.0f} steps/s")
+
+    with VecEnv(args.envs, args.workers, seed=args.seed, difficulty=args.difficulty) as vec:
+        _, masks = vec.reset()
+        episodes = wins = 0
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            _, rewards, term, trunc, masks = vec.step(random_legal(masks, rng))
+            episodes += int(np.count_nonzero(term | trunc))
+            wins += int(np.count_nonzero(rewards > 0))
+        elapsed = time.perf_counter() - start
+    print(f"{args.envs} envs / {len(vec.procs)} workers: {args.steps / elapsed:>8.0f} batch steps/s, "
+          f"{args.envs * args.steps / elapsed:.0f} env steps/s")
+    print(f"random legal agent: {episodes} games finished, won {wins}")
+
+
+if __name__ == "__main__":
+    main()
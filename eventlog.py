@@ -0,0 +1,116 @@
+"""Structured, leveled event log. Records go into a fixed-size ring buffer and a background thread
+writes them out in batches, so logging never holds up a frame on a slow terminal or a redirected log.
+
+    log = EventLog(sys.stdout, level=INFO)
+    game.events = log            # the engine's plays, draws, flips and bot moves
+    log.emit(INFO, "undo", frame=120)
+    log.close()                  # writes out whatever is still buffered
+
+With no log attached (game.events is None, the default) the engine doesn't build records at all.
+
+    python eventlog.py game.jsonl         # counts per event and seat from a --log-format json log
+"""
+import json, sys, threading, time
+from collections import Counter, deque
+
+DEBUG, INFO, WARNING = 10, 20, 30
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING}
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN"}
+
+
+class EventLog:
+    """Records are (time, level, event, fields). Below `level` emit() returns straight away. If the
+       writer falls more than `capacity` records behind, the oldest unwritten ones are dropped (and
+       counted) rather than blocking the caller. fmt is "text" or "json" (one object per line)."""
+
+    def __init__(self, out=sys.stdout, level=INFO, capacity=4096, interval=0.1, fmt="text"):
+        self.out = out
+        self.level = level
+        self.interval = interval
+        self.format = self.format_json if fmt == "json" else self.format_text
+        self.ring = deque(maxlen=capacity)
+        self.counts = Counter()      # records emitted per event name
+        self.dropped = 0
+        self.start = time.monotonic()
+        self.lock = threading.Lock()          # ring and dropped
+        self.write_lock = threading.Lock()    # one flush writing at a time
+        self.wake = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="eventlog", daemon=True)
+        self.thread.start()
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, event, **fields):
+        if level < self.level:
+            return
+        ring = self.ring
+        record = (time.monotonic(), level, event, fields)
+        # the lock is only ever held for a swap in flush(), never while writing, so this doesn't wait
+        # on the output
+        with self.lock:
+            if len(ring) == ring.maxlen:
+                self.dropped += 1
+            ring.append(record)
+        self.counts[event] += 1
+        # don't wait out the interval if the buffer is filling up
+        if len(ring) > ring.maxlen // 2:
+            self.wake.set()
+
+    def format_text(self, record):
+        t, level, event, fields = record
+        parts = [f"{t - self.start:9.3f} {LEVEL_NAMES[level]:<5} {event}"]
+        parts += [f"{k}={v}" for k, v in fields.items()]
+        return " ".join(parts) + "\n"
+
+    def format_json(self, record):
+        t, level, event, fields = record
+        return json.dumps({"t": round(t - self.start, 4), "level": LEVEL_NAMES[level], "event": event, **fields}) + "\n"
+
+    def flush(self):
+        """Write out everything buffered so far, in one write."""
+        with self.write_lock:
+            with self.lock:
+                records = list(self.ring)
+                self.ring.clear()
+                dropped, self.dropped = self.dropped, 0
+            batch = [self.format(record) for record in records]
+            if dropped:
+                batch.append(self.format((time.monotonic(), WARNING, "log_dropped", {"records": dropped})))
+            if batch:
+                self.out.write("".join(batch))
+                self.out.flush()
+
+    def _run(self):
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+    def close(self):
+        self.running = False
+        self.wake.set()
+        self.thread.join()
+        self.flush()
+
+
+def summarize(lines):
+    """Counter of (event, seat) over the records of a json log; seat is None for table-wide events."""
+    counts = Counter()
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            counts[record["event"], record.get("seat")] += 1
+    return counts
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        counts = summarize(f)
+    for (event, seat), n in sorted(counts.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        print(f"{event:<16} {'' if seat is None else f'seat {seat}':<7} {n:>7}")
+
+
+if __name__ == "__main__":
+    main()
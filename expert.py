@@ -0,0 +1,171 @@
+"""Search-based "Expert" bot.
+
+The bot can see the centers and both hands but not the order of the face-down piles, so every
+candidate play is scored by determinized Monte Carlo: deal the hidden pile cards into a random
+order, make the play and finish the game with play_headless; the average over many samples is an
+expectimax estimate over the hidden order. Samples are spread round-robin over the candidates until
+a hard per-move time budget runs out.
+
+Results go in a transposition table keyed on a compact hash of what the bot can see, so the same
+position (e.g. nothing changed since the last tick) is never searched twice. Searches run on a
+worker thread and are started as soon as the table changes, so the frame loop never waits for one;
+if the answer isn't in yet when the bot's turn comes, it falls back to the normal move generator.
+"""
+import random, time
+from concurrent.futures import ThreadPoolExecutor
+from speed import (PLAYER, BOT, BOT_HAND, PLAY_LEFT, PLAY_RIGHT, CARD_RANKS, NEIGHBORS, RANKS, BOT_DELAY,
+                   SLOT_LISTS, BACK_POSITIONS, play_headless)
+
+MOVE_BUDGET = 0.03          # seconds of search per position
+MAX_TABLE = 200000          # transposition table entries before it gets cleared
+
+
+def state_key(game):
+    """Compact hash of the position as the bot sees it: center ranks, both hands as rank sets
+       (slot order doesn't matter), and every pile's size."""
+    board = game.board
+    return hash((CARD_RANKS[board[PLAY_LEFT]], CARD_RANKS[board[PLAY_RIGHT]],
+                 tuple(game.rank_slots[PLAYER]), tuple(game.rank_slots[BOT]),
+                 game.occupied[PLAYER], game.occupied[BOT],
+                 *(len(game.piles[i]) for i in BACK_POSITIONS)))
+
+
+def candidate_moves(game):
+    """Every distinct (rank, side) the bot could play right now."""
+    board = game.board
+    left, right = CARD_RANKS[board[PLAY_LEFT]], CARD_RANKS[board[PLAY_RIGHT]]
+    moves = []
+    for rank in RANKS:
+        if game.rank_mask[BOT] >> rank & 1:
+            if NEIGHBORS[left] >> rank & 1:
+                moves.append((rank, PLAY_LEFT))
+            if NEIGHBORS[right] >> rank & 1:
+                moves.append((rank, PLAY_RIGHT))
+    return moves
+
+
+def slot_for(game, rank, side):
+    """Turn a (rank, side) table entry back into a (slot, side) move on this board."""
+    pos = SLOT_LISTS[game.rank_slots[BOT][rank]][0]
+    return BOT_HAND[pos], side
+
+
+def determinize(game, rng):
+    """Copy of game with the face-down cards shuffled between the piles (pile sizes kept)."""
+    sample = game.clone(rng)
+    hidden = [card for i in BACK_POSITIONS for card in sample.piles[i]]
+    rng.shuffle(hidden)
+    for i in BACK_POSITIONS:
+        n = len(sample.piles[i])
+        sample.piles[i] = hidden[:n]
+        del hidden[:n]
+    return sample
+
+
+def rollout(game, move, rng, player_delay):
+    """Play move on a random determinization and finish the game. 1 = bot wins, 0 = player wins, 0.5 = stall."""
+    sample = determinize(game, rng)
+    sample.bot_play(*slot_for(sample, *move))
+    sample.bot_timer = 0
+    winner, _ = play_headless(sample, player_delay=player_delay)
+    if winner == "bot":
+        return 1.0
+    if winner == "player":
+        return 0.0
+    return 0.5
+
+
+def search(game, budget=MOVE_BUDGET, player_delay=BOT_DELAY, rng=None):
+    """Best (rank, side) for the bot within budget seconds, or None if it has no play."""
+    moves = candidate_moves(game)
+    if len(moves) <= 1:
+        return moves[0] if moves else None
+    rng = rng or random.Random()
+    totals = [0.0] * len(moves)
+    counts = [0] * len(moves)
+    deadline = time.perf_counter() + budget
+    i = 0
+    # round robin over the candidates until the budget is spent; the deadline is checked before every
+    # rollout, so a slow one can overrun it by at most its own length
+    while time.perf_counter() < deadline:
+        k = i % len(moves)
+        totals[k] += rollout(game, moves[k], rng, player_delay)
+        counts[k] += 1
+        i += 1
+    # best found so far among the sampled ones (the first candidate if there wasn't time for any)
+    best = max(range(len(moves)), key=lambda k: totals[k] / counts[k] if counts[k] else -1.0)
+    return moves[best]
+
+
+class ExpertBot:
+    """Bot policy backed by search() and a transposition table. Install with game.bot_policy = bot.policy.
+
+    With background=True searches run on one worker thread (kick them off with prepare() whenever the
+    table changes); with background=False the policy searches inline, which is what simulations want."""
+
+    def __init__(self, budget=MOVE_BUDGET, player_delay=BOT_DELAY, background=True, seed=None):
+        self.budget = budget
+        self.player_delay = player_delay
+        self.rng = random.Random(seed)
+        self.table = {}            # state key -> (rank, side) or None
+        self.pending = {}          # state key -> future of a running search
+        self.pool = ThreadPoolExecutor(max_workers=1) if background else None
+        self.hits = self.misses = 0
+
+    def store(self, key, move):
+        if len(self.table) >= MAX_TABLE:
+            self.table.clear()
+        self.table[key] = move
+
+    def prepare(self, game):
+        """Start a background search for the current position unless it's cached or already running."""
+        if self.pool is None:
+            return
+        self.collect()
+        key = state_key(game)
+        if key in self.table or key in self.pending:
+            return
+        # the worker only ever touches its own copy of the game
+        snapshot = game.clone()
+        self.pending[key] = self.pool.submit(search, snapshot, self.budget, self.player_delay,
+                                             random.Random(self.rng.random()))
+
+    def lookup(self, key):
+        if key in self.table:
+            return True, self.table[key]
+        fut = self.pending.get(key)
+        if fut is not None and fut.done() and not fut.cancelled():
+            del self.pending[key]
+            move = fut.result()
+            self.store(key, move)
+            return True, move
+        return False, None
+
+    def policy(self, game):
+        """bot_policy hook: the searched move for this position, or the plain bot's move if it isn't ready."""
+        key = state_key(game)
+        found, move = self.lookup(key)
+        if not found and self.pool is None:
+            move = search(game, self.budget, self.player_delay, self.rng)
+            self.store(key, move)
+            found = True
+        if found:
+            self.hits += 1
+            return slot_for(game, *move) if move is not None else None
+        self.misses += 1
+        self.prepare(game)
+        return game.find_move(BOT, game.rng)
+
+    def collect(self):
+        """Move finished searches into the table and cancel queued ones: their position is already gone."""
+        for key, fut in list(self.pending.items()):
+            if fut.done():
+                del self.pending[key]
+                if not fut.cancelled():
+                    self.store(key, fut.result())
+            elif fut.cancel():
+                del self.pending[key]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
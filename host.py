@@ -0,0 +1,161 @@
+"""Headless multi-table host: thousands of bot-vs-bot Speed tables in one process, on one asyncio event loop.
+
+Every table is its own SpeedGame (own piles, hands and centers) driven by an AutoMatch, so the rules,
+flips and refills are exactly the engine's. A table keeps one timer on the loop, set for its next
+event (player move, bot move or inactivity flip) at the game's real pace times --time-scale, and a
+finished table is replaced by a fresh deal so the table count stays constant.
+
+Tick latency is how late a table's timer fired: it stays near zero until the loop runs out of CPU,
+then grows, which is the point where adding tables stops adding throughput.
+
+    python host.py --tables 2000 --duration 10
+    python host.py --sweep 100,1000,5000,10000 --duration 5
+"""
+import argparse, asyncio, random, time
+from speed import SpeedGame, AutoMatch, FPS, BOT_DELAY, DIFFICULTIES, OP_PLAY, OP_BOT_PLAY
+from profiler import RollingHistogram
+
+LATENCY_WINDOW = 100000     # tick latency samples kept for the percentiles
+
+
+class HostStats:
+    """Counters for one reporting interval plus a rolling histogram of tick latency."""
+
+    def __init__(self):
+        self.latency = RollingHistogram(LATENCY_WINDOW)
+        self.reset()
+
+    def reset(self):
+        self.moves = self.actions = self.finished = self.ticks = 0
+        self.busy = 0.0
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def count(self, frame, op, a, b):
+        """game.recorder hook: every engine action, plays counted separately."""
+        self.actions += 1
+        if op == OP_PLAY or op == OP_BOT_PLAY:
+            self.moves += 1
+
+    def snapshot(self):
+        """Rates since the last reset: dict of moves/s, actions/s, tables/s, loop busy and CPU share, latency."""
+        wall = max(time.perf_counter() - self.wall, 1e-9)
+        return dict(moves=self.moves / wall, actions=self.actions / wall, tables=self.finished / wall,
+                    ticks=self.ticks / wall, busy=self.busy / wall, cpu=(time.process_time() - self.cpu) / wall,
+                    p50=self.latency.percentile(50), p99=self.latency.percentile(99))
+
+
+class Host:
+    """Keeps `tables` matches running on the current event loop until stop() (or `matches` have finished)."""
+
+    def __init__(self, tables, difficulty="medium", player_delay=BOT_DELAY, time_scale=1.0, matches=None, seed=None):
+        self.loop = asyncio.get_running_loop()
+        self.tables = tables
+        self.bot_delay, self.bot_skip = DIFFICULTIES[difficulty]
+        self.player_delay = player_delay
+        self.frame_seconds = time_scale / FPS
+        self.matches = matches
+        self.rng = random.Random(seed)
+        self.stats = HostStats()
+        self.started = 0
+        self.live = 0
+        self.running = True
+        self.done = self.loop.create_future()
+
+    def start(self):
+        # spread the first moves over one bot period so the tables don't all tick on the same instant
+        spread = self.bot_delay * self.frame_seconds
+        for _ in range(self.tables):
+            self.new_table(self.rng.random() * spread)
+
+    def new_table(self, delay=0.0):
+        if not self.running or (self.matches is not None and self.started >= self.matches):
+            return
+        game = SpeedGame(bot_delay=self.bot_delay, bot_skip=self.bot_skip, rng=random.Random(self.rng.random()))
+        game.recorder = self.stats.count
+        match = AutoMatch(game, self.player_delay)
+        self.started += 1
+        self.live += 1
+        due = self.loop.time() + delay + match.next_step() * self.frame_seconds
+        self.loop.call_at(due, self.tick, match, due)
+
+    def tick(self, match, due):
+        """A table's timer fired: play its next event and set the timer for the one after."""
+        stats = self.stats
+        start = time.perf_counter()
+        stats.latency.add(max(self.loop.time() - due, 0.0))
+        match.step()
+        stats.ticks += 1
+        if match.over or not self.running:
+            stats.finished += match.over
+            self.live -= 1
+            self.new_table()
+            if not self.live and not self.done.done():
+                self.done.set_result(None)
+        else:
+            # next deadline follows from this one, not from now, so a late tick doesn't slow the game down
+            due += match.next_step() * self.frame_seconds
+            self.loop.call_at(due, self.tick, match, due)
+        stats.busy += time.perf_counter() - start
+
+    def stop(self):
+        """Let every table play one more event and then drop it."""
+        self.running = False
+
+
+def report_line(tables, s):
+    return (f"{tables:>7} {s['moves']:>10.0f} {s['actions']:>10.0f} {s['tables']:>9.1f} {s['ticks']:>9.0f} "
+            f"{s['busy'] * 100:>5.0f}% {s['cpu'] * 100:>5.0f}% {s['p50']:>8.2f} {s['p99']:>8.2f}")
+
+
+HEADER_LINE = (f"{'tables':>7} {'moves/s':>10} {'actions/s':>10} {'tables/s':>9} {'ticks/s':>9} "
+               f"{'busy':>6} {'cpu':>6} {'p50 ms':>8} {'p99 ms':>8}")
+
+
+async def run(tables, duration, interval=1.0, **kwargs):
+    """Host `tables` tables for `duration` seconds, printing a line every interval; returns the overall rates."""
+    host = Host(tables, **kwargs)
+    host.start()
+    overall = HostStats()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end and not host.done.done():
+        await asyncio.wait([host.done], timeout=min(interval, max(end - time.perf_counter(), 0)))
+        if interval < duration:
+            print(report_line(host.live, host.stats.snapshot()))
+        for name in ("moves", "actions", "finished", "ticks", "busy"):
+            setattr(overall, name, getattr(overall, name) + getattr(host.stats, name))
+        host.stats.reset()
+    overall.latency = host.stats.latency
+    result = overall.snapshot()
+    host.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many headless Speed tables on one event loop")
+    parser.add_argument("--tables", type=int, default=1000, help="tables kept running at once")
+    parser.add_argument("--sweep", help="comma separated table counts to measure one after another")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--matches", type=int, help="stop after this many tables have been dealt")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default="medium")
+    parser.add_argument("--player-delay", type=int, default=BOT_DELAY, help="frames between the player side's moves")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="seconds of wall time per second of game time (0.01 = 100x faster than real time)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    options = dict(difficulty=args.difficulty, player_delay=args.player_delay, time_scale=args.time_scale,
+                   matches=args.matches, seed=args.seed)
+    if args.sweep:
+        print(HEADER_LINE)
+        for tables in (int(n) for n in args.sweep.split(",")):
+            print(report_line(tables, asyncio.run(run(tables, args.duration, interval=args.duration, **options))))
+    else:
+        print(HEADER_LINE)
+        overall = asyncio.run(run(args.tables, args.duration, **options))
+        print("overall")
+        print(report_line(args.tables, overall))
+
+
+if __name__ == "__main__":
+    main()
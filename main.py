@@ -1,548 +1,612 @@
-import pygame, random, math
-pygame.init()
-
-# ---------------- CONFIG ----------------
-FPS = 60
-WIDTH, HEIGHT = 1075, 800
-SCALE = 0.3
-BG = (0, 60, 0)
-SNAP_RADIUS = 150  # pixels
-DEFAULT_INACTIVITY_SECONDS = 2.5  # default timeout (adjustable)
-# ----------------------------------------
-
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Speed")
-
-# load cardback and scale
-cardback = pygame.image.load("card sprites/cardback.png").convert_alpha()
-w, h = cardback.get_size()
-cardback = pygame.transform.smoothscale(cardback, (int(w * SCALE), int(h * SCALE)))
-
-# load all card faces (filenames expected to be like 'ace_of_spades.png', '2_of_spades.png', etc.)
-cards = {}
-suits = ["spades", "clubs", "diamonds", "hearts"]
-values = ["ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "jack", "queen", "king"]
-# create keys like "1_of_spades", "11_of_hearts", etc. to match your earlier code
-for suit in suits:
-    for i, val in enumerate(values, start=1):
-        key = f"{i}_of_{suit}"
-        path = f"card sprites/{val}_of_{suit}.png"
-        img = pygame.image.load(path).convert_alpha()
-        w, h = img.get_size()
-        cards[key] = pygame.transform.smoothscale(img, (int(w * SCALE), int(h * SCALE)))
-
-# positions (index comments for clarity)
-cardPos = [
-    (350, 285),     # 0 play left
-    (550, 285),     # 1 play right
-    (150, 285),     # 2 center back right (pile)
-    (750, 285),     # 3 center back left (pile)
-    (25, 555),      # 4 player hand 1
-    (200, 555),     # 5 player hand 2
-    (375, 555),     # 6 player hand 3
-    (550, 555),     # 7 player hand 4
-    (725, 555),     # 8 player hand 5
-    (900, 555),     # 9 player draw pile (back)
-    (25, 25),       # 10 bot hand 1
-    (200, 25),      # 11 bot hand 2
-    (375, 25),      # 12 bot hand 3
-    (550, 25),      # 13 bot hand 4
-    (725, 25),      # 14 bot hand 5
-    (900, 25)       # 15 bot draw pile (back)
-]
-
-# pile sizes for back positions
-pile_sizes = {2: 5, 3: 5, 9: 15, 15: 15}
-deck_piles = {}       # position index -> list of card names
-used_cards = set()    # names already used on board or in piles
-
-def getCardNum(card_key):
-    # card_key format: "1_of_spades", "11_of_hearts", etc.
-    base = card_key.split("_")[0]
-    try:
-        return int(base)
-    except:
-        return 0
-
-# prepare sprite containers
-placed_sprites = []
-back_positions = [2, 3, 9, 15]
-PlayCards = [cardPos[0], cardPos[1]]  # positions for center play (left and right)
-
-# shuffle deck and create piles
-all_card_names = list(cards.keys())
-random.shuffle(all_card_names)
-for pos_index, size in pile_sizes.items():
-    pile = []
-    for _ in range(size):
-        if not all_card_names:
-            break
-        name = all_card_names.pop()
-        pile.append(name)
-        used_cards.add(name)
-    deck_piles[pos_index] = pile
-
-# create initial visible front cards and backs
-sprite_names = list(cards.keys())
-random.shuffle(sprite_names)
-front_count = 0
-cardset = []
-
-for i, pos in enumerate(cardPos):
-    if i in back_positions:
-        rect = cardback.get_rect(topleft=pos)
-        placed_sprites.append({
-            "image": cardback,
-            "rect": rect,
-            "dragging": False,
-            "draggable": False,
-            "orig_pos": pos,
-            "is_back": True,
-            "pile_index": i
-        })
-    else:
-        # take the next random sprite for initial layout (player and bot hands + center open slots)
-        if not sprite_names:
-            continue
-        name = sprite_names.pop()
-        rect = cards[name].get_rect(topleft=pos)
-        # only first two front cards (the center play cards) are non-draggable; 
-        # others: player hand positions (4-8) draggable, bot hand non-draggable for player
-        draggable = (4 <= i <= 8)  # only player hand slots are draggable by player
-        placed_sprites.append({
-            "image": cards[name],
-            "rect": rect,
-            "dragging": False,
-            "draggable": draggable,
-            "orig_pos": pos,
-            "name": name,
-            "is_back": False,
-            "number": getCardNum(name)
-        })
-        used_cards.add(name)
-        # first two non-back placed are the center play cards for initial cardset
-        cardset.append(getCardNum(name))
-        front_count += 1
-
-# ensure cardset has two values
-if len(cardset) >= 2:
-    cardset = [cardset[0], cardset[1]]
-else:
-    cardset = [1, 1]
-
-# game state helpers
-clock = pygame.time.Clock()
-running = True
-
-# dragging helpers and flags
-dragging = False
-dragged_sprite = None
-
-# Bot timing & inactivity timeframe (set by difficulty screen later)
-BOT_DELAY = 90
-BOT_SMART = True
-bot_timer = 0
-
-# inactivity timer (frames) adjustable; default to provided seconds
-INACTIVITY_THRESHOLD = int(DEFAULT_INACTIVITY_SECONDS * FPS)
-inactivity_timer = 0
-
-# ------------------ Helper functions ------------------
-
-def remove_back_card(pos_index):
-    """Remove the back sprite at pos_index if present (visual removal)."""
-    pos = cardPos[pos_index]
-    for s in placed_sprites[:]:
-        if s.get("is_back") and s["rect"].topleft == pos:
-            placed_sprites.remove(s)
-            # also clear deck_piles entry to avoid future use
-            deck_piles[pos_index] = []
-            print(f"Removed back card at pile {pos_index}")
-            break
-
-def draw_new_cards():
-    """When player clicks pile 9: fill empty player hand slots (4-8) from deck_piles[9]."""
-    global placed_sprites, used_cards, deck_piles
-    hand_positions = cardPos[4:9]
-    empty_slots = [p for p in hand_positions if not any(s["rect"].topleft == p for s in placed_sprites if not s.get("is_back"))]
-    if not empty_slots:
-        return
-    pile = deck_piles.get(9, [])
-    if not pile:
-        remove_back_card(9)
-        print("Player draw pile empty.")
-        return
-    for pos in empty_slots:
-        if not pile:
-            remove_back_card(9)
-            break
-        name = pile.pop()
-        used_cards.add(name)
-        placed_sprites.append({
-            "image": cards[name],
-            "rect": cards[name].get_rect(topleft=pos),
-            "dragging": False,
-            "draggable": True,
-            "orig_pos": pos,
-            "name": name,
-            "is_back": False,
-            "number": getCardNum(name)
-        })
-        print(f"Drew {name} into {pos}")
-    deck_piles[9] = pile
-    if not pile:
-        remove_back_card(9)
-
-def refill_bot_hand(empty_pos):
-    """Refill one bot hand position from pile 15. If empty_pos is None, fill first available."""
-    global placed_sprites, deck_piles, used_cards
-    pile = deck_piles.get(15, [])
-    if not pile:
-        remove_back_card(15)
-        return
-    if empty_pos is None:
-        hand_positions = cardPos[10:15]
-        used_positions = [s["rect"].topleft for s in placed_sprites if not s.get("is_back")]
-        possibles = [p for p in hand_positions if p not in used_positions]
-        if not possibles:
-            return
-        empty_pos = possibles[0]
-    name = pile.pop()
-    used_cards.add(name)
-    placed_sprites.append({
-        "image": cards[name],
-        "rect": cards[name].get_rect(topleft=empty_pos),
-        "dragging": False,
-        "draggable": False,  # bot cards are not draggable by player
-        "orig_pos": empty_pos,
-        "name": name,
-        "is_back": False,
-        "number": getCardNum(name)
-    })
-    deck_piles[15] = pile
-    if not pile:
-        remove_back_card(15)
-
-def bot_can_play(cardnum, center_num):
-    """Return True if cardnum can be played on a center card value center_num."""
-    return (abs(cardnum - center_num) == 1) or (cardnum == 13 and center_num == 1) or (cardnum == 1 and center_num == 13)
-
-def get_current_center_values():
-    """Read the actual current numbers of the two center play cards (prefer visible sprites)."""
-    left_val, right_val = None, None
-    for s in placed_sprites:
-        if s["rect"].topleft == cardPos[0] and not s.get("is_back"):
-            left_val = s["number"]
-        if s["rect"].topleft == cardPos[1] and not s.get("is_back"):
-            right_val = s["number"]
-    if left_val is None: left_val = cardset[0]
-    if right_val is None: right_val = cardset[1]
-    return [left_val, right_val]
-
-def bot_take_turn():
-    """Bot attempts to play one valid card, else draws. Resets inactivity timer on a successful play."""
-    global placed_sprites, cardset, deck_piles, inactivity_timer
-    bot_hand_positions = cardPos[10:15]
-    left_center_pos, right_center_pos = cardPos[0], cardPos[1]
-    left_val, right_val = get_current_center_values()
-    bot_hand = [s for s in placed_sprites if s["rect"].topleft in bot_hand_positions and not s.get("is_back")]
-    random.shuffle(bot_hand)
-    for s in bot_hand:
-        num = s["number"]
-        hand_pos = s["rect"].topleft
-        if bot_can_play(num, left_val):
-            # remove old center-left card (if any)
-            for other in placed_sprites[:]:
-                if other["rect"].topleft == left_center_pos and not other.get("is_back"):
-                    placed_sprites.remove(other)
-            s["rect"].topleft = left_center_pos
-            s["draggable"] = False
-            s["orig_pos"] = left_center_pos
-            cardset[0] = num
-            inactivity_timer = 0
-            refill_bot_hand(hand_pos)
-            print(f"Bot plays {s.get('name')} on LEFT -> {cardset}")
-            return True
-        if bot_can_play(num, right_val):
-            for other in placed_sprites[:]:
-                if other["rect"].topleft == right_center_pos and not other.get("is_back"):
-                    placed_sprites.remove(other)
-            s["rect"].topleft = right_center_pos
-            s["draggable"] = False
-            s["orig_pos"] = right_center_pos
-            cardset[1] = num
-            inactivity_timer = 0
-            refill_bot_hand(hand_pos)
-            print(f"Bot plays {s.get('name')} on RIGHT -> {cardset}")
-            return True
-    # nothing playable -> draw one card into bot hand
-    pile = deck_piles.get(15, [])
-    if pile:
-        print("Bot cannot play, drawing...")
-        refill_bot_hand(None)
-    else:
-        print("Bot pile empty.")
-    return False
-
-def isValidCard(card_name, dropped_pos):
-    """Check if player's card can be placed onto dropped_pos (must be PlayCards[0] or PlayCards[1]).
-       If valid, update cardset and reset inactivity timer."""
-    global cardset, inactivity_timer
-    cardnum = getCardNum(card_name)
-    if dropped_pos == PlayCards[0]:
-        side = "left"
-        center_val = cardset[0]
-    elif dropped_pos == PlayCards[1]:
-        side = "right"
-        center_val = cardset[1]
-    else:
-        return False
-    valid = False
-    if cardnum + 1 == center_val or cardnum - 1 == center_val:
-        valid = True
-    elif cardnum == 13 and center_val == 1:
-        valid = True
-    elif cardnum == 1 and center_val == 13:
-        valid = True
-    if not valid:
-        return False
-    # update center side and reset inactivity
-    if side == "left":
-        cardset[0] = cardnum
-    else:
-        cardset[1] = cardnum
-    inactivity_timer = 0
-    print(f"Valid play: {card_name} -> {side} -> {cardset}")
-    return True
-
-def flip_new_center_cards():
-    """Flip top cards from deck_piles[2] and deck_piles[3] into the center (if both available).
-       If either pile empties, both backs are removed."""
-    global cardset, deck_piles, inactivity_timer
-    pile2 = deck_piles.get(2, [])
-    pile3 = deck_piles.get(3, [])
-    if not pile2 or not pile3:
-        # remove both backs if either empty
-        remove_back_card(2)
-        remove_back_card(3)
-        print("Center piles empty -> backs removed.")
-        return
-    left_card = pile2.pop()
-    right_card = pile3.pop()
-    # remove current visual center cards (non-backs)
-    for s in placed_sprites[:]:
-        if s["rect"].topleft in [cardPos[0], cardPos[1]] and not s.get("is_back"):
-            placed_sprites.remove(s)
-    # add new center cards (non-draggable)
-    for card_name, pos in zip([left_card, right_card], [cardPos[0], cardPos[1]]):
-        placed_sprites.append({
-            "image": cards[card_name],
-            "rect": cards[card_name].get_rect(topleft=pos),
-            "dragging": False,
-            "draggable": False,
-            "orig_pos": pos,
-            "name": card_name,
-            "is_back": False,
-            "number": getCardNum(card_name)
-        })
-    cardset = [getCardNum(left_card), getCardNum(right_card)]
-    inactivity_timer = 0
-    print(f"Flipped new centers: {cardset}")
-    # if either exhausted now -> remove both backs
-    if not deck_piles.get(2) or not deck_piles.get(3):
-        remove_back_card(2)
-        remove_back_card(3)
-        print("Center piles depleted after flip -> backs removed.")
-
-def check_winner():
-    """Return 'player' or 'bot' or None if no winner. Only call when not dragging."""
-    player_hand_positions = cardPos[4:9]
-    bot_hand_positions = cardPos[10:15]
-    player_cards = [s for s in placed_sprites if s["rect"].topleft in player_hand_positions and not s.get("is_back")]
-    bot_cards = [s for s in placed_sprites if s["rect"].topleft in bot_hand_positions and not s.get("is_back")]
-    player_pile = deck_piles.get(9, [])
-    bot_pile = deck_piles.get(15, [])
-    if not player_cards and not player_pile:
-        return "player"
-    if not bot_cards and not bot_pile:
-        return "bot"
-    return None
-
-def show_winner_screen(winner):
-    """Display winner and wait for click to quit."""
-    font = pygame.font.SysFont("arial", 72)
-    small = pygame.font.SysFont("arial", 32)
-    if winner == "player":
-        text = "YOU WIN!"
-        color = (0, 200, 0)
-    else:
-        text = "BOT WINS!"
-        color = (200, 0, 0)
-    screen.fill((0, 40, 0))
-    title = font.render(text, True, color)
-    rect = title.get_rect(center=(WIDTH//2, HEIGHT//2 - 40))
-    screen.blit(title, rect)
-    prompt = small.render("Click anywhere to quit", True, (255,255,255))
-    screen.blit(prompt, prompt.get_rect(center=(WIDTH//2, HEIGHT//2 + 50)))
-    pygame.display.flip()
-    waiting = True
-    while waiting:
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); exit()
-            if ev.type == pygame.MOUSEBUTTONDOWN:
-                waiting = False
-    pygame.quit(); exit()
-
-# ---------------- difficulty selection screen ----------------
-def choose_difficulty():
-    font = pygame.font.SysFont("arial", 48)
-    small = pygame.font.SysFont("arial", 28)
-    title = font.render("Choose Bot Difficulty", True, (255,255,255))
-    options = [
-        {"label": "Easy", "rect": pygame.Rect(WIDTH//2 - 220, HEIGHT//2, 160, 64), "color": (0,120,0)},
-        {"label": "Medium", "rect": pygame.Rect(WIDTH//2 - 20, HEIGHT//2, 160, 64), "color": (180,150,0)},
-        {"label": "Hard", "rect": pygame.Rect(WIDTH//2 + 180, HEIGHT//2, 160, 64), "color": (150,0,0)}
-    ]
-    while True:
-        screen.fill((0,40,0))
-        screen.blit(title, title.get_rect(center=(WIDTH//2, HEIGHT//3)))
-        for opt in options:
-            pygame.draw.rect(screen, opt["color"], opt["rect"], border_radius=10)
-            lbl = small.render(opt["label"], True, (255,255,255))
-            screen.blit(lbl, lbl.get_rect(center=opt["rect"].center))
-        pygame.display.flip()
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); exit()
-            if ev.type == pygame.MOUSEBUTTONDOWN:
-                for opt in options:
-                    if opt["rect"].collidepoint(ev.pos):
-                        print("Difficulty:", opt["label"])
-                        return opt["label"].lower()
-
-difficulty = choose_difficulty()
-if difficulty == "easy":
-    BOT_DELAY = 180; BOT_SMART = False
-elif difficulty == "medium":
-    BOT_DELAY = 90; BOT_SMART = True
-else:
-    BOT_DELAY = 45; BOT_SMART = True
-
-# Make inactivity threshold adjustable (default 2.5s)
-INACTIVITY_THRESHOLD = int(DEFAULT_INACTIVITY_SECONDS * FPS)
-
-# ---------------- MAIN LOOP ----------------
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        # MOUSE DOWN: either start drag (player hand) or click back piles
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            for s in reversed(placed_sprites):
-                if s["rect"].collidepoint(event.pos):
-                    # if it's a back pile sprite
-                    if s.get("is_back"):
-                        pile_index = s.get("pile_index")
-                        if pile_index in (2, 3):
-                            flip_new_center_cards()
-                            break
-                        if pile_index == 9:
-                            draw_new_cards()
-                            break
-                        if pile_index == 15:
-                            # optionally trigger bot draw or ignore
-                            break
-                    # start dragging if this is a player's draggable card (only player hand slots are draggable)
-                    if s.get("draggable"):
-                        dragging = True
-                        dragged_sprite = s
-                        s["dragging"] = True
-                        mx, my = event.pos
-                        s["offset"] = (s["rect"].x - mx, s["rect"].y - my)
-                        # bring to top visually
-                        placed_sprites.append(placed_sprites.pop(placed_sprites.index(s)))
-                        break
-
-        # MOUSE UP: release any dragging sprite, try snap/placement
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if dragged_sprite:
-                # try to snap to closest PlayCard
-                dragged_sprite["dragging"] = False
-                sprite = dragged_sprite
-                dragged_sprite = None
-                dragging = False
-
-                # compute closest center slot
-                sprite_center = sprite["rect"].center
-                closest_pos = None
-                closest_dist = float("inf")
-                for target_pos in PlayCards:
-                    target_center = (target_pos[0] + sprite["rect"].width//2, target_pos[1] + sprite["rect"].height//2)
-                    dist = math.hypot(sprite_center[0] - target_center[0], sprite_center[1] - target_center[1])
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        closest_pos = target_pos
-
-                snapped = False
-                if closest_pos and closest_dist < SNAP_RADIUS:
-                    # only accept if valid play on that specific side
-                    if isValidCard(sprite["name"], closest_pos):
-                        # remove any existing center card (non-back)
-                        for other in placed_sprites[:]:
-                            if other is not sprite and other["rect"].topleft == closest_pos and not other.get("is_back"):
-                                placed_sprites.remove(other)
-                        sprite["rect"].topleft = closest_pos
-                        sprite["draggable"] = False  # lock it in center
-                        snapped = True
-                if not snapped:
-                    # revert to original pos
-                    sprite["rect"].topleft = sprite["orig_pos"]
-
-    # update dragging positions while mouse held
-    for s in placed_sprites:
-        if s.get("dragging"):
-            mx, my = pygame.mouse.get_pos()
-            ox, oy = s.get("offset", (0,0))
-            s["rect"].x = mx + ox
-            s["rect"].y = my + oy
-
-    # BOT turn timing
-    bot_timer += 1
-    if bot_timer >= BOT_DELAY:
-        # BOT_SMART controls behavior: if false, bot sometimes skips attempts
-        if BOT_SMART or random.random() < 0.5:
-            bot_take_turn()
-        bot_timer = 0
-
-    # inactivity logic: increment only when not dragging
-    if not dragging:
-        inactivity_timer += 1
-    # else do not increment inactivity while player is dragging last card (prevents false win)
-
-    if inactivity_timer >= INACTIVITY_THRESHOLD:
-        print("Inactivity threshold reached -> flipping new center cards")
-        flip_new_center_cards()
-        inactivity_timer = 0
-
-    # draw
-    screen.fill(BG)
-    for s in placed_sprites:
-        screen.blit(s["image"], s["rect"])
-
-    # check winner only when not dragging (prevents false win when player picks up last card)
-    if not dragging:
-        winner = check_winner()
-        if winner:
-            show_winner_screen(winner)
-
-    # debug idle display (optional)
-    font = pygame.font.SysFont("arial", 20)
-    timer_text = font.render(f"Idle: {inactivity_timer//FPS}s", True, (255,255,255))
-    screen.blit(timer_text, (10, HEIGHT-30))
-
-    pygame.display.flip()
-    clock.tick(FPS)
-
+import pygame, argparse, random, sys, time
+from speed import SpeedGame, Layout
+from view import TableView, cardPos, SEAT1_POS, table_positions
+from atlas import SpriteAtlas, AtlasCache
+from render import Renderer
+from expert import ExpertBot
+from profiler import FrameProfiler
+from replay import Recorder, new_seed
+from timers import Scheduler
+from netplay import NetClient
+from snapshot import SnapshotRing, SnapshotError, snapshot, restore
+from eventlog import EventLog, LEVELS, INFO, WARNING
+from dealer import DealPool
+pygame.init()
+
+# ---------------- CONFIG ----------------
+FPS = 60
+WIDTH, HEIGHT = 1075, 800
+SCALE = 0.3
+SMALL_SCALE = 0.2  # cards on the bigger table variants
+SCALE_STEP = 0.02  # resizable window: card scales are rounded to this so cached sprite sets get reused
+MIN_SCALE = 0.1
+SPRITE_CACHE_MB = 64  # sprite sets for recently used scales kept in memory
+BG = (0, 60, 0)
+SNAP_RADIUS = 150  # pixels
+UNDO_DEPTH = 256  # player moves that can be taken back
+DEFAULT_INACTIVITY_SECONDS = 2.5  # default timeout (adjustable)
+# ----------------------------------------
+
+parser = argparse.ArgumentParser(description="Speed card game")
+parser.add_argument("--profile", action="store_true", help="start with the frame-time overlay on (F3 toggles it)")
+parser.add_argument("--profile-csv", metavar="PATH", help="stream per-frame phase times to a CSV file")
+parser.add_argument("--seed", type=int, help="deal a specific game (the seed is printed at startup either way)")
+parser.add_argument("--any-deal", action="store_true", help="plain random deal instead of one from the fair-deal pool")
+parser.add_argument("--record", metavar="PATH", help="record the game for replay.py")
+parser.add_argument("--connect", metavar="HOST:PORT", help="play another person at a netplay.py server instead of the bot")
+parser.add_argument("--seats", type=int, default=2, help="2-4 (you plus 1-3 bots)")
+parser.add_argument("--decks", type=int, default=1, help="1-4 decks shuffled together")
+parser.add_argument("--centers", type=int, default=2, help="2-6 center piles")
+parser.add_argument("--resizable", action="store_true", help="resizable window, cards rescaled to fit")
+parser.add_argument("--save", metavar="PATH", default="speed.save", help="save-game file for F5 (save) and F9 (load)")
+parser.add_argument("--load", metavar="PATH", help="resume a saved game (its table layout replaces --seats/--decks/--centers)")
+parser.add_argument("--log-level", choices=[*LEVELS, "off"], default="info",
+                    help="game event log: debug adds every draw, off turns it off entirely")
+parser.add_argument("--log", metavar="PATH", help="append the event log to a file instead of the console")
+parser.add_argument("--log-format", choices=["text", "json"], default="text", help="json: one record per line (see eventlog.py)")
+args = parser.parse_args()
+loaded = loaded_data = None
+if args.load and (args.connect or args.record):
+    parser.error("--load is for local games that aren't being recorded")
+if args.load:
+    try:
+        with open(args.load, "rb") as f:
+            loaded_data = f.read()
+        loaded = restore(loaded_data)
+    except (OSError, SnapshotError) as e:
+        parser.error(f"can't load {args.load}: {e}")
+    args.seats, args.decks, args.centers = loaded.layout.seats, loaded.layout.decks, loaded.layout.centers
+try:
+    layout = Layout(args.seats, args.decks, args.centers)
+except ValueError as e:
+    parser.error(str(e))
+if args.connect and not layout.classic:
+    parser.error("network games use the classic table")
+
+# game events are buffered and written by a background thread (eventlog.py), never from inside a frame
+event_log = log_file = None
+if args.log_level != "off":
+    if args.log:
+        log_file = open(args.log, "a")
+    event_log = EventLog(log_file or sys.stdout, LEVELS[args.log_level], fmt=args.log_format)
+
+def emit(level, event, **fields):
+    if event_log is not None:
+        event_log.emit(level, event, **fields)
+
+screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE if args.resizable else 0)
+pygame.display.set_caption("Speed")
+
+# load the cardback and all card faces from the pre-scaled atlas (built and cached on first run, see atlas.py)
+card_scale = SCALE if layout.classic_slots else SMALL_SCALE
+cards = SpriteAtlas(card_scale)
+snap_radius = SNAP_RADIUS * card_scale / SCALE
+
+# network events and finished sprite rescales wake the main loop (posted from their threads)
+NET_EVENT = pygame.USEREVENT
+SCALE_EVENT = pygame.USEREVENT + 1
+net = None
+
+def wait_for_opponent(host, port):
+    """Connect to a netplay.py server; returns once the table is dealt."""
+    client = NetClient()
+    client.start_thread(host, int(port), notify=lambda: pygame.event.post(pygame.event.Event(NET_EVENT)))
+    screen.fill((0, 40, 0))
+    text = pygame.font.SysFont("arial", 48).render("Waiting for an opponent...", True, (255, 255, 255))
+    w, h = screen.get_size()
+    screen.blit(text, text.get_rect(center=(w//2, h//2)))
+    pygame.display.flip()
+    while not client.ready.wait(0.05):
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                pygame.quit(); exit()
+    if client.error is not None or client.seat is None:
+        print("Could not connect:", client.error or "no seat from the server")
+        pygame.quit(); exit()
+    client.poll()
+    print("Connected, seat", client.seat)
+    return client
+
+recorder = None
+deal_pool = None
+if args.connect:
+    # the server holds the real table; game is the client's predicted copy of it
+    host, port = args.connect.rsplit(":", 1)
+    net = game = wait_for_opponent(host, port)
+    # the card already snaps back on the next sync; just say why
+    net.on_reject = lambda slot, side: emit(INFO, "play_rejected", slot=slot, side=side)
+    view = TableView(game, cards, SEAT1_POS if net.seat else cardPos, net.seat)
+else:
+    # all the rules and table state live in the headless engine (speed.py); this file only draws it
+    seed = args.seed
+    if seed is None and layout.classic and not (args.any_deal or loaded):
+        # a deal both sides can win in about as many moves, analyzed ahead of time (see dealer.py);
+        # the pool is topped up in the background for the next game
+        deal_pool = DealPool()
+        deal = deal_pool.take()
+        deal_pool.start()
+        if deal is not None:
+            seed = deal["seed"]
+            print(f"Fair deal: you need {deal['player']} moves, the bot {deal['bot']}")
+        else:
+            print("No fair deals analyzed yet, dealing at random (the pool fills in the background)")
+    if seed is None:
+        seed = new_seed()
+    print("Seed:", seed)
+    game = SpeedGame(inactivity_threshold=int(DEFAULT_INACTIVITY_SECONDS * FPS), rng=random.Random(seed),
+                     layout=layout)
+    if loaded is not None:
+        restore(loaded_data, game)
+    game.events = event_log
+    # sprites for the table (see view.py); view.placed_sprites is the draw order
+    view = TableView(game, cards, table_positions(layout, cards.cell, WIDTH, HEIGHT))
+base_scale = card_scale
+base_positions = view.positions
+
+# game state helpers
+running = True
+
+# search bot, only used on Expert
+expert_bot = None
+
+# dragging helpers and flags
+dragging = False
+drag_pos = None        # newest MOUSEMOTION position while dragging; only the last one each frame is used
+table_changed = False  # sync_sprites() ran this frame, so the renderer has to look at every sprite
+
+# snapshots taken before each of the player's moves, for undo (local games only)
+history = SnapshotRing(UNDO_DEPTH)
+
+# ------------------ Helper functions ------------------
+
+def sync_sprites():
+    """Update the sprites after the engine changed the table."""
+    global table_changed
+    table_changed = True
+    view.sync()
+    if expert_bot is not None:
+        expert_bot.prepare(game)
+
+def check_winner():
+    """Return 'player' or 'bot' or None if no winner. Only call when not dragging."""
+    return game.winner()
+
+def rewind(data=None):
+    """Undo the player's last move (and whatever the bots did since), or load a saved table."""
+    if net is not None or dragging:
+        return
+    if recorder is not None:
+        emit(WARNING, "undo_off", reason="recording")
+        return
+    try:
+        if data is None:
+            if not history.undo(game):
+                emit(WARNING, "undo_empty")
+                return
+        else:
+            saved = restore(data).layout
+            if (saved.seats, saved.decks, saved.centers) != (layout.seats, layout.decks, layout.centers):
+                emit(WARNING, "load_failed", path=args.save, reason=f"{saved.seats} seat, {saved.centers} center table (use --load)")
+                return
+            restore(data, game)
+            history.clear()
+    except SnapshotError as e:
+        emit(WARNING, "load_failed", path=args.save, reason=e)
+        return
+    # the loaded timers count from now
+    timers.schedule("bot", BOT_PERIOD)
+    timers.schedule("idle", IDLE_PERIOD)
+    sync_sprites()
+    emit(INFO, "undo" if data is None else "load", frame=game.frame, undo_left=len(history))
+
+def remember_move(move, *args):
+    """Run one of the player's moves, keeping the table from before it for undo if it went through."""
+    if net is not None:
+        return move(*args)
+    history.push(game)
+    done = move(*args)
+    if not done:
+        history.discard()
+    return done
+
+def save_game():
+    if net is not None:
+        return
+    with open(args.save, "wb") as f:
+        f.write(snapshot(game))
+    emit(INFO, "save", frame=game.frame, path=args.save)
+
+def load_game():
+    try:
+        with open(args.save, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        emit(WARNING, "load_failed", path=args.save, reason=e.strerror)
+        return
+    rewind(data)
+
+def finish_logs():
+    global event_log, log_file
+    if recorder is not None:
+        recorder.close(game)
+    if event_log is not None:
+        event_log.close()
+        event_log = None
+    if log_file is not None:
+        log_file.close()
+        log_file = None
+
+def show_winner_screen(winner):
+    """Display winner and wait for click to quit."""
+    emit(INFO, "winner", frame=game.frame, winner=winner)
+    finish_logs()
+    font = pygame.font.SysFont("arial", 72)
+    small = pygame.font.SysFont("arial", 32)
+    if winner == "player":
+        text = "YOU WIN!"
+        color = (0, 200, 0)
+    elif winner == "opponent":
+        text = "OPPONENT WINS!"
+        color = (200, 0, 0)
+    elif winner == "stalled":
+        text = "NO MORE MOVES"
+        color = (200, 200, 200)
+    else:
+        text = "BOT WINS!"
+        color = (200, 0, 0)
+    title = font.render(text, True, color)
+    prompt = small.render("Click anywhere to quit", True, (255,255,255))
+
+    def draw():
+        # centered on the window as it is now (it may have been resized)
+        w, h = screen.get_size()
+        screen.fill((0, 40, 0))
+        screen.blit(title, title.get_rect(center=(w//2, h//2 - 40)))
+        screen.blit(prompt, prompt.get_rect(center=(w//2, h//2 + 50)))
+        pygame.display.flip()
+    draw()
+    waiting = True
+    while waiting:
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                pygame.quit(); exit()
+            if ev.type == pygame.MOUSEBUTTONDOWN:
+                waiting = False
+            if ev.type == pygame.VIDEORESIZE:
+                draw()
+    pygame.quit(); exit()
+
+# ---------------- difficulty selection screen ----------------
+def choose_difficulty():
+    font = pygame.font.SysFont("arial", 48)
+    small = pygame.font.SysFont("arial", 28)
+    title = font.render("Choose Bot Difficulty", True, (255,255,255))
+    options = [
+        {"label": "Easy", "dx": -380, "color": (0,120,0)},
+        {"label": "Medium", "dx": -180, "color": (180,150,0)},
+        {"label": "Hard", "dx": 20, "color": (150,0,0)},
+        {"label": "Expert", "dx": 220, "color": (90,0,120)}
+    ]
+
+    def draw():
+        # nothing on this screen changes, so it's only drawn again if the window is resized
+        w, h = screen.get_size()
+        screen.fill((0,40,0))
+        screen.blit(title, title.get_rect(center=(w//2, h//3)))
+        for opt in options:
+            opt["rect"] = pygame.Rect(w//2 + opt["dx"], h//2, 160, 64)
+            pygame.draw.rect(screen, opt["color"], opt["rect"], border_radius=10)
+            lbl = small.render(opt["label"], True, (255,255,255))
+            screen.blit(lbl, lbl.get_rect(center=opt["rect"].center))
+        pygame.display.flip()
+    draw()
+    while True:
+        ev = pygame.event.wait()
+        if ev.type == pygame.QUIT:
+            pygame.quit(); exit()
+        if ev.type == pygame.VIDEORESIZE:
+            draw()
+        if ev.type == pygame.MOUSEBUTTONDOWN:
+            for opt in options:
+                if opt["rect"].collidepoint(ev.pos):
+                    print("Difficulty:", opt["label"])
+                    return opt["label"].lower()
+
+difficulty = choose_difficulty() if net is None else None
+if net is None:
+    game.set_difficulty(difficulty)
+if difficulty == "expert" and not layout.classic:
+    print("The Expert search only knows the classic table; bots play at Expert speed without it")
+elif difficulty == "expert":
+    # searches run on a worker thread; sync_sprites() kicks one off whenever the table changes
+    expert_bot = ExpertBot()
+    game.bot_policy = expert_bot.policy
+if args.record and net is None:
+    recorder = Recorder(args.record, seed, game)
+    game.recorder = recorder
+sync_sprites()
+renderer = Renderer(screen, BG)
+
+# frame-time profiler: per-phase histograms, F3 shows p50/p95/p99 on screen
+# input latency: from when the loop picks up a drag motion or click to the display update showing it
+# the loop only runs when something happens, so the window is 10 seconds, not a number of frames
+# (the ring holds up to 1000 frames a second, more than mouse motion events ever arrive at)
+profiler = FrameProfiler(["wait", "events", "drag", "timers", "winner", "blit", "display"], window=10 * 1000,
+                         seconds=10, idle=["wait"], inputs=["drag", "click"],
+                         csv_path=args.profile_csv)
+show_profile = args.profile
+profiler.set_enabled(show_profile)
+
+def update_profile_overlay():
+    for i, line in enumerate(profiler.summary_lines()):
+        renderer.label(f"profile{i}", line, (10, 250 + 16 * i), size=14, name="couriernew", background=(0, 0, 0))
+
+def hide_profile_overlay():
+    for i in range(len(profiler.hist)):
+        renderer.remove_label(f"profile{i}")
+
+# ---------------- TIMERS ----------------
+# bot moves and inactivity flips run off wall-clock deadlines instead of frame counts, so a slow
+# frame doesn't slow the game down and the loop can sleep until the next deadline or input
+timers = Scheduler()
+start_time = timers.now()
+PROFILE_REFRESH = 0.25
+idle_paused = None  # seconds left on the inactivity countdown while the player is dragging
+
+def on_activity():
+    """A play or flip restarts the inactivity countdown (it stays paused while dragging)."""
+    global idle_paused
+    if dragging:
+        idle_paused = IDLE_PERIOD
+    else:
+        timers.schedule("idle", IDLE_PERIOD)
+
+def update_idle_label():
+    """Idle seconds so far; wakes the loop again when the number on screen changes."""
+    left = idle_paused if dragging else timers.remaining("idle")
+    if left is None:
+        return   # network game: the server runs the inactivity flips
+    elapsed = IDLE_PERIOD - left
+    renderer.label("idle", f"Idle: {int(elapsed)}s", (10, screen.get_height()-30))
+    if not dragging:
+        timers.schedule("label", int(elapsed) + 1 - elapsed)
+
+def game_frame():
+    """Frames since the start at FPS, so recordings keep frame numbers."""
+    return int((timers.now() - start_time) * FPS)
+
+if net is None:
+    BOT_PERIOD = game.bot_delay / FPS
+    IDLE_PERIOD = game.inactivity_threshold / FPS
+    game.on_activity = on_activity
+    timers.schedule("bot", BOT_PERIOD)
+    timers.schedule("idle", IDLE_PERIOD)
+if show_profile:
+    timers.schedule("profile", PROFILE_REFRESH)
+
+# ---------------- WINDOW SCALING ----------------
+# with --resizable the card scale follows the window size. Sprite sets for other scales are built on
+# a worker thread and the current one stays on screen until the new one is ready
+def scale_ready():
+    # called from the atlas worker thread, which can finish just as the game quits
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(SCALE_EVENT))
+
+atlases = AtlasCache(SPRITE_CACHE_MB << 20, notify=scale_ready)
+atlases.add(cards)
+wanted_scale = card_scale
+layout_stale = False  # window size changed since the positions were worked out
+
+def fit_scale(size):
+    fit = min(size[0] / WIDTH, size[1] / HEIGHT)
+    return round(max(MIN_SCALE, round(base_scale * fit / SCALE_STEP) * SCALE_STEP), 2)
+
+def apply_scale(atlas):
+    """Show the table with atlas's sprites, scaled positions centered in the window."""
+    global cards, snap_radius, layout_stale
+    f = atlas.scale / base_scale
+    w, h = screen.get_size()
+    ox, oy = (w - WIDTH * f) / 2, (h - HEIGHT * f) / 2
+    cards = atlas
+    snap_radius = SNAP_RADIUS * atlas.scale / SCALE
+    view.set_cards(atlas, [(int(ox + x * f), int(oy + y * f)) for x, y in base_positions])
+    layout_stale = False
+    sync_sprites()
+    renderer.invalidate()
+
+def update_scale():
+    """Switch to the wanted scale once its sprites are ready; until then re-center the current one.
+       Waits while a card is being dragged (its sprite would be rebuilt under the mouse)."""
+    if dragging:
+        return
+    atlases.poll()
+    atlas = atlases.request(wanted_scale)
+    if atlas is not None and (atlas is not cards or layout_stale):
+        apply_scale(atlas)
+    elif layout_stale:
+        apply_scale(cards)
+
+def on_resize(size):
+    global screen, wanted_scale, layout_stale
+    screen = renderer.screen = pygame.display.get_surface()
+    renderer.invalidate()
+    wanted_scale = fit_scale(size)
+    layout_stale = True
+    update_scale()
+
+# ---------------- MAIN LOOP ----------------
+frame_end = time.perf_counter()
+while running:
+    profiler.begin_frame()
+    # sleep until input arrives or the next timer is due; a dragged card moves on MOUSEMOTION events,
+    # so the loop doesn't need to poll the mouse at a fixed frame rate either.
+    # woke is when the events were picked up, for input latency: input that was already queued came
+    # in while the last frame was busy, so it counts from the end of that frame, not from now
+    timeout = timers.timeout_ms()
+    events = pygame.event.get()
+    woke = frame_end
+    if not events and timeout != 0:
+        events = [pygame.event.wait() if timeout is None else pygame.event.wait(timeout)]
+        woke = time.perf_counter()
+        events += pygame.event.get()
+    profiler.mark("wait")
+    game.frame = game_frame()
+    table_changed = False
+
+    for event in events:
+        if event.type == pygame.QUIT:
+            running = False
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            show_profile = not show_profile
+            profiler.set_enabled(show_profile)
+            if show_profile:
+                timers.schedule("profile", 0)
+            else:
+                timers.cancel("profile")
+                hide_profile_overlay()
+
+        # F5 / F9 save and load the table, Backspace or Ctrl+Z takes back your last move
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+            save_game()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+            load_game()
+        elif event.type == pygame.KEYDOWN and (event.key == pygame.K_BACKSPACE or
+                                               (event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL)):
+            rewind()
+
+        elif event.type == pygame.VIDEORESIZE:
+            on_resize(event.size)
+
+        # a sprite set for a new scale finished building in the background
+        elif event.type == SCALE_EVENT:
+            update_scale()
+
+        # the server sent a new table state (or turned down one of our plays)
+        elif event.type == NET_EVENT:
+            net.poll()
+            sync_sprites()
+            if net.closed and not net.result:
+                emit(WARNING, "disconnected")
+                running = False
+
+        # a card is being dragged: remember where to (several motions in one frame collapse into the last)
+        elif event.type == pygame.MOUSEMOTION:
+            if dragging:
+                drag_pos = event.pos
+                profiler.input("drag", woke)
+
+        # MOUSE DOWN: either start drag (player hand) or click back piles
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            # the view's grid finds the card under the mouse without looking at the rest of the table
+            s = view.sprite_at(event.pos)
+            # if it's a back pile sprite
+            if s is not None and s.get("is_back"):
+                pile_index = s.get("pile_index")
+                if pile_index in game.layout.center_piles:
+                    remember_move(game.flip_new_center_cards)
+                    sync_sprites()
+                    profiler.input("click", woke)
+                elif pile_index == view.own_pile:
+                    remember_move(game.draw_new_cards)
+                    sync_sprites()
+                    profiler.input("click", woke)
+                # an opponent's pile: ignore
+            # start dragging if this is a player's draggable card (only player hand slots are draggable)
+            elif s is not None and s.get("draggable"):
+                dragging = True
+                # inactivity doesn't count while dragging (prevents false win)
+                idle_paused = timers.remaining("idle")
+                timers.cancel("idle")
+                timers.cancel("label")
+                view.dragged_sprite = s
+                s["dragging"] = True
+                mx, my = event.pos
+                s["offset"] = (s["rect"].x - mx, s["rect"].y - my)
+                drag_pos = None
+                # bring to top visually
+                view.placed_sprites.append(view.placed_sprites.pop(view.placed_sprites.index(s)))
+
+        # MOUSE UP: release any dragging sprite, try snap/placement
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if view.dragged_sprite:
+                # try to snap to closest PlayCard
+                view.dragged_sprite["dragging"] = False
+                sprite = view.dragged_sprite
+                view.dragged_sprite = None
+                dragging = False
+                if idle_paused is not None:
+                    timers.schedule("idle", idle_paused)
+                    idle_paused = None
+
+                # closest center within snap range (grid lookup); an illegal play leaves the card in its slot
+                side = view.snap_target(sprite["rect"].center, snap_radius)
+                if side is not None:
+                    remember_move(game.play_card, sprite["slot"], side)
+                sprite["rect"].topleft = sprite["orig_pos"]
+                drag_pos = None
+                sync_sprites()
+                update_scale()
+                profiler.input("click", woke)
+
+    profiler.mark("events")
+
+    # move the dragged card to the newest mouse position
+    if drag_pos is not None:
+        s = view.dragged_sprite
+        ox, oy = s["offset"]
+        s["rect"].topleft = (drag_pos[0] + ox, drag_pos[1] + oy)
+        drag_pos = None
+
+    profiler.mark("drag")
+
+    # BOT moves + inactivity flips, whichever deadlines have passed
+    for name, due in timers.pop_due():
+        game.frame = int((due - start_time) * FPS)
+        if name == "bot":
+            # next move one period after this one was due, however late this frame ran
+            now = timers.now()
+            timers.at("bot", due + BOT_PERIOD if due + BOT_PERIOD > now else now + BOT_PERIOD)
+            game.bot_tick()
+            sync_sprites()
+        elif name == "idle":
+            emit(INFO, "inactivity", frame=game.frame)
+            game.flip_new_center_cards()
+            timers.schedule("idle", IDLE_PERIOD)
+            sync_sprites()
+        elif name == "profile":
+            update_profile_overlay()
+            timers.schedule("profile", PROFILE_REFRESH)
+    profiler.mark("timers")
+
+    # check winner only when not dragging (prevents false win when player picks up last card)
+    if not dragging:
+        winner = check_winner()
+        if winner:
+            show_winner_screen(winner)
+
+    profiler.mark("winner")
+
+    # debug idle display (optional), re-rendered only when the seconds change
+    update_idle_label()
+
+    # draw only what changed; if the table itself didn't change, only the dragged card can have moved
+    moved = view.dragged_sprite if dragging and not table_changed else None
+    rects = renderer.draw(view.placed_sprites, moved)
+    profiler.mark("blit")
+    renderer.push(rects)
+    profiler.presented(rects is None or bool(rects))
+    profiler.mark("display")
+    profiler.end_frame()
+    frame_end = time.perf_counter()
+
+if expert_bot is not None:
+    expert_bot.close()
+if net is not None:
+    net.close()
+atlases.close()
+if deal_pool is not None:
+    deal_pool.stop()
+profiler.close()
+finish_logs()
 pygame.quit()
\ No newline at end of file
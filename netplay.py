@@ -0,0 +1,534 @@
+"""Two-player Speed over asyncio: an authoritative table server and a predicting client.
+
+The server owns the only SpeedGame. Clients send their plays and draws and the server applies them
+in arrival order, so when both players drop on the same center at once the first one to arrive
+wins; a play aimed at a center card that has since been covered is rejected. After every change the
+server sends both seats a delta: a bit mask of the table fields (board slots, then pile sizes) that
+changed plus their new values, so a single play costs about a dozen bytes on the wire.
+
+Clients apply their own plays straight away and keep them in flight until the server acknowledges
+their sequence number. Every update rebuilds the predicted board from the server's table plus the
+plays still in flight, so a rejected play just disappears (rollback).
+
+Seat 0 plays the player hand (slots 4-8, pile 9), seat 1 the bot hand (slots 10-14, pile 15).
+
+    python netplay.py serve --port 8765
+    python main.py --connect 127.0.0.1:8765         # twice, one window per player
+    python netplay.py loopback --games 20           # server + two auto clients over 127.0.0.1, prints RTTs
+"""
+import argparse, asyncio, queue, random, socket, struct, threading, time
+from collections import deque
+from speed import (SpeedGame, PLAYABLE, CARD_RANKS, EMPTY, NUM_SLOTS, BACK_POSITIONS, HAND_SLOTS, HAND_PILES,
+                   PLAY_LEFT, PLAY_RIGHT, DEFAULT_INACTIVITY_SECONDS, CLASSIC)
+from replay import WINNER_CODES
+
+DEFAULT_PORT = 8765
+MSG_WELCOME, MSG_STATE, MSG_REJECT, MSG_PLAY, MSG_DRAW, MSG_FLIP = range(1, 7)
+HEADER = struct.Struct("<BB")       # body length, message type
+PLAY = struct.Struct("<HBBb")       # seq, hand slot, side, card the client saw on that center
+SEQ = struct.Struct("<H")           # draw / flip / reject: just the seq
+STATE = struct.Struct("<HBI")       # last seq handled for this seat, result, change mask; then one i8 per change
+STALLED = 3                         # result code next to WINNER_CODES: nobody can move any more
+# table fields: the 16 board slots, then the size of each back pile
+STATE_SIZE = NUM_SLOTS + len(BACK_POSITIONS)
+PILE_FIELD = {slot: NUM_SLOTS + i for i, slot in enumerate(BACK_POSITIONS)}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def message(kind, body=b""):
+    return HEADER.pack(len(body), kind) + body
+
+
+def table_state(game):
+    return game.board + [len(game.piles[i]) for i in BACK_POSITIONS]
+
+
+def encode_delta(old, new):
+    """(mask, packed values) of the fields of new that differ from old (all of them if old is None)."""
+    changed = [i for i in range(STATE_SIZE) if old is None or old[i] != new[i]]
+    return sum(1 << i for i in changed), struct.pack(f"{len(changed)}b", *(new[i] for i in changed))
+
+
+def state_message(kind, ack, result, delta, prefix=b""):
+    mask, values = delta
+    return message(kind, prefix + STATE.pack(ack, result, mask) + values)
+
+
+def seq_done(seq, ack):
+    """True if seq is at or before ack (seqs are u16 and wrap)."""
+    return (ack - seq) & 0xFFFF < 0x8000
+
+
+def set_nodelay(writer):
+    # every message is tiny and latency-bound: don't let Nagle hold them back
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+async def read_messages(reader):
+    """Yield (type, body) until the connection closes."""
+    while True:
+        try:
+            n, kind = HEADER.unpack(await reader.readexactly(HEADER.size))
+            body = await reader.readexactly(n)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        yield kind, body
+
+
+async def after(first, messages):
+    """The message the `first` task reads, then the rest of messages."""
+    try:
+        yield await first
+    except StopAsyncIteration:
+        return
+    async for item in messages:
+        yield item
+
+
+# ------------------ server ------------------
+
+class Table:
+    """One authoritative game between two seats. Everything runs on the event loop thread."""
+
+    def __init__(self, writers, seed=None, inactivity=DEFAULT_INACTIVITY_SECONDS):
+        self.loop = asyncio.get_running_loop()
+        self.game = SpeedGame(rng=random.Random(seed))
+        self.game.on_activity = self.restart_idle
+        self.writers = writers
+        self.inactivity = inactivity
+        self.acks = [0, 0]
+        self.sent = table_state(self.game)      # what both seats have been told so far
+        self.result = 0
+        self.idle = None
+        self.moves = self.rejects = 0
+        self.done = self.loop.create_future()
+
+    def start(self):
+        full = encode_delta(None, self.sent)
+        for seat, writer in enumerate(self.writers):
+            writer.write(state_message(MSG_WELCOME, 0, 0, full, bytes([seat])))
+        self.restart_idle()
+
+    def restart_idle(self):
+        if self.idle is not None:
+            self.idle.cancel()
+        self.idle = self.loop.call_later(self.inactivity, self.on_idle)
+
+    def on_idle(self):
+        self.idle = None
+        self.game.flip_new_center_cards()       # a flip restarts the timer through on_activity
+        if self.idle is None:
+            self.restart_idle()
+        self.broadcast(None)
+
+    def handle(self, seat, kind, body):
+        game = self.game
+        if kind == MSG_PLAY:
+            seq, slot, side, expect = PLAY.unpack(body)
+            # first drop to arrive wins; a later one aimed at a card that has since been covered is stale
+            ok = (slot in HAND_SLOTS[seat] and side in (PLAY_LEFT, PLAY_RIGHT) and game.board[side] == expect
+                  and game.play_card(slot, side))
+        elif kind == MSG_DRAW:
+            seq, = SEQ.unpack(body)
+            ok = game.draw_new_cards(seat)
+        elif kind == MSG_FLIP:
+            seq, = SEQ.unpack(body)
+            ok = game.flip_new_center_cards()
+        else:
+            raise ProtocolError(f"unexpected message type {kind}")
+        self.acks[seat] = seq
+        if kind == MSG_PLAY and not ok:
+            self.rejects += 1
+            self.writers[seat].write(message(MSG_REJECT, SEQ.pack(seq)))
+            return
+        self.moves += 1
+        self.broadcast(seat)
+
+    def broadcast(self, seat):
+        """Send what changed since the last broadcast to both seats (seat gets its ack even if nothing did)."""
+        game = self.game
+        new = table_state(game)
+        if not self.result:
+            winner = game.winner()
+            self.result = WINNER_CODES[winner] if winner else STALLED if game.is_stalled() else 0
+        delta = encode_delta(self.sent, new)
+        self.sent = new
+        for s, writer in enumerate(self.writers):
+            if delta[0] or s == seat or self.result:
+                writer.write(state_message(MSG_STATE, self.acks[s], self.result, delta))
+        if self.result:
+            self.finish()
+
+    def forfeit(self, seat):
+        """seat disconnected mid-game: the other seat wins."""
+        if not self.result:
+            self.result = WINNER_CODES[("bot", "player")[seat]]
+            self.broadcast(None)
+
+    def finish(self):
+        if self.idle is not None:
+            self.idle.cancel()
+            self.idle = None
+        for writer in self.writers:
+            writer.close()
+        if not self.done.done():
+            self.done.set_result(self.result)
+
+
+class Server:
+    """Pairs connections up in arrival order and deals a new Table for every pair."""
+
+    def __init__(self, inactivity=DEFAULT_INACTIVITY_SECONDS, seed=None):
+        self.inactivity = inactivity
+        self.rng = random.Random(seed)
+        self.waiting = None
+        self.tables = []
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.on_connect, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def on_connect(self, reader, writer):
+        set_nodelay(writer)
+        messages = read_messages(reader)
+        if self.waiting is None:
+            joined = asyncio.get_running_loop().create_future()
+            self.waiting = (writer, joined)
+            # clients send nothing before the deal, so if the reader returns first this one hung up (or
+            # broke the protocol): stop waiting so the next connection isn't paired with a dead socket
+            first = asyncio.ensure_future(anext(messages))
+            try:
+                await asyncio.wait((joined, first), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not joined.done():
+                    if self.waiting is not None and self.waiting[0] is writer:
+                        self.waiting = None
+                    joined.cancel()
+                    first.cancel()
+                    writer.close()
+            if joined.cancelled():
+                return
+            table = joined.result()
+            messages = after(first, messages)
+            seat = 0
+        else:
+            other, joined = self.waiting
+            self.waiting = None
+            table = Table([other, writer], self.rng.randrange(1 << 63), self.inactivity)
+            self.tables.append(table)
+            table.done.add_done_callback(lambda _: self.tables.remove(table))
+            table.start()
+            joined.set_result(table)
+            seat = 1
+        async for kind, body in messages:
+            if table.result:
+                break
+            try:
+                table.handle(seat, kind, body)
+            except (ProtocolError, struct.error):
+                break
+        table.forfeit(seat)
+
+
+# ------------------ client ------------------
+
+class NetClient:
+    """One seat at a remote table, with enough of the SpeedGame interface for TableView and main.py.
+
+    board is the predicted table: the server's last state with this client's plays that are still
+    in flight applied on top. In threaded mode (start_thread) the socket lives on a background event
+    loop and incoming messages wait in an inbox until poll() applies them on the caller's thread."""
+
+    def __init__(self):
+        self.layout = CLASSIC         # network tables are always the classic two-seat one
+        self.seat = None
+        self.server = [EMPTY] * STATE_SIZE
+        self.board = self.server[:NUM_SLOTS]
+        self.in_flight = deque()      # (seq, time sent, (slot, side, card) for a play else None)
+        self.seq = 0
+        self.result = 0
+        self.closed = False
+        self.rtts = []
+        self.rejected = 0
+        self.state_bytes = self.states = 0
+        self.on_reject = None         # optional callable(slot, side) when the server turns a play down
+        self.loop = self.writer = None
+        self.inbox = None
+        self.notify = None
+        self.ready = threading.Event()
+
+    # ---- connection ----
+
+    async def connect(self, host, port):
+        """Open the connection and wait for the deal (the server deals once both seats are in).
+           Raises ConnectionError if the server hangs up first, ProtocolError if it sends garbage."""
+        self.loop = asyncio.get_running_loop()
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        set_nodelay(self.writer)
+        async for kind, body in read_messages(self.reader):
+            try:
+                self.feed(kind, body)
+            except (struct.error, IndexError):
+                raise ProtocolError("malformed message from the server")
+            if kind == MSG_WELCOME:
+                return
+        raise ConnectionError("server closed before the deal")
+
+    async def run(self):
+        """Read messages until the game ends or the connection drops."""
+        async for kind, body in read_messages(self.reader):
+            if self.inbox is None:
+                self.feed(kind, body)
+            else:
+                self.inbox.put((kind, body))
+                if self.notify is not None:
+                    self.notify()
+        self.closed = True
+        if self.notify is not None:
+            self.notify()
+
+    def start_thread(self, host, port, notify=None):
+        """Run the connection on a daemon thread. notify() is called from that thread whenever
+           poll() has something to apply (main.py posts a pygame event)."""
+        self.inbox = queue.SimpleQueue()
+        self.notify = notify
+        self.error = None
+
+        async def main():
+            try:
+                await self.connect(host, port)
+            except (OSError, ProtocolError) as e:
+                self.error = e
+                self.closed = True
+                return
+            finally:
+                self.ready.set()
+            await self.run()
+
+        threading.Thread(target=asyncio.run, args=(main(),), daemon=True).start()
+
+    def poll(self):
+        """Apply everything the network thread has received. Returns True if anything arrived."""
+        got = False
+        while True:
+            try:
+                kind, body = self.inbox.get_nowait()
+            except queue.Empty:
+                return got
+            self.feed(kind, body)
+            got = True
+
+    def send(self, kind, body=b""):
+        """Queue a message for the server; dropped once the connection is gone."""
+        if self.closed:
+            return
+        data = message(kind, body)
+        if self.inbox is None:
+            self.writer.write(data)
+        else:
+            self.call_on_loop(self.writer.write, data)
+
+    def close(self):
+        if self.writer is not None and not self.closed:
+            if self.inbox is None:
+                self.writer.close()
+            else:
+                self.call_on_loop(self.writer.close)
+
+    def call_on_loop(self, fn, *args):
+        try:
+            self.loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            # the server hung up and the network thread's loop has shut down since closed was checked
+            pass
+
+    # ---- incoming ----
+
+    def feed(self, kind, body):
+        if kind == MSG_WELCOME:
+            self.seat = body[0]
+            self.apply_state(memoryview(body)[1:])
+        elif kind == MSG_STATE:
+            self.apply_state(body)
+        elif kind == MSG_REJECT:
+            seq, = SEQ.unpack(body)
+            for entry in self.in_flight:
+                if entry[0] == seq:
+                    self.in_flight.remove(entry)
+                    self.rtts.append(time.perf_counter() - entry[1])
+                    self.rejected += 1
+                    if self.on_reject is not None and entry[2] is not None:
+                        self.on_reject(*entry[2][:2])
+                    break
+            self.rebuild()
+        else:
+            raise ProtocolError(f"unexpected message type {kind}")
+
+    def apply_state(self, body):
+        ack, self.result, mask = STATE.unpack_from(body)
+        fields = [i for i in range(STATE_SIZE) if mask >> i & 1]
+        for i, value in zip(fields, struct.unpack_from(f"{len(fields)}b", body, STATE.size)):
+            self.server[i] = value
+        self.states += 1
+        self.state_bytes += HEADER.size + len(body)
+        now = time.perf_counter()
+        while self.in_flight and seq_done(self.in_flight[0][0], ack):
+            self.rtts.append(now - self.in_flight.popleft()[1])
+        self.rebuild()
+
+    def rebuild(self):
+        """Predicted board = server board + the plays still in flight that still make sense on it."""
+        board = self.server[:NUM_SLOTS]
+        for _, _, play in self.in_flight:
+            if play is not None:
+                slot, side, card = play
+                if board[slot] == card and PLAYABLE[CARD_RANKS[card]][CARD_RANKS[board[side]]]:
+                    board[side] = card
+                    board[slot] = EMPTY
+        self.board = board
+
+    # ---- outgoing (same names as SpeedGame so main.py can drive either) ----
+
+    def next_seq(self, play=None):
+        self.seq = self.seq % 0xFFFF + 1
+        self.in_flight.append((self.seq, time.perf_counter(), play))
+        return self.seq
+
+    def play_card(self, slot, side):
+        """Play straight onto the predicted board and tell the server. False if it isn't legal here."""
+        board = self.board
+        card = board[slot]
+        if self.result or card == EMPTY or slot not in HAND_SLOTS[self.seat]:
+            return False
+        if not PLAYABLE[CARD_RANKS[card]][CARD_RANKS[board[side]]]:
+            return False
+        seq = self.next_seq((slot, side, card))
+        self.send(MSG_PLAY, PLAY.pack(seq, slot, side, board[side]))
+        self.rebuild()
+        return True
+
+    def draw_new_cards(self):
+        # the pile's cards are hidden, so draws wait for the server
+        self.send(MSG_DRAW, SEQ.pack(self.next_seq()))
+
+    def flip_new_center_cards(self):
+        self.send(MSG_FLIP, SEQ.pack(self.next_seq()))
+
+    # ---- queries ----
+
+    def pile_size(self, slot):
+        return self.server[PILE_FIELD[slot]]
+
+    def pile_visible(self, slot):
+        return self.pile_size(slot) > 0
+
+    def find_move(self, rng=None):
+        """(slot, side) of a legal play on the predicted board, or None."""
+        board = self.board
+        moves = [(slot, side) for slot in HAND_SLOTS[self.seat] if board[slot] != EMPTY
+                 for side in (PLAY_LEFT, PLAY_RIGHT) if PLAYABLE[CARD_RANKS[board[slot]]][CARD_RANKS[board[side]]]]
+        if not moves:
+            return None
+        return rng.choice(moves) if rng is not None else moves[0]
+
+    def can_draw(self):
+        hand = HAND_SLOTS[self.seat]
+        return self.pile_visible(HAND_PILES[self.seat]) and any(self.board[slot] == EMPTY for slot in hand)
+
+    def winner(self):
+        """None while playing, else 'player' (this seat won), 'opponent' or 'stalled'."""
+        if not self.result:
+            return None
+        if self.result == STALLED:
+            return "stalled"
+        return "player" if self.result - 1 == self.seat else "opponent"
+
+
+# ------------------ headless clients ------------------
+
+async def auto_play(client, delay, rng):
+    """Headless stand-in player: every ~delay seconds play a legal card, else draw."""
+    while not client.result and not client.closed:
+        await asyncio.sleep(delay * (0.5 + rng.random()))
+        move = client.find_move(rng)
+        if move is not None:
+            client.play_card(*move)
+        elif client.can_draw():
+            client.draw_new_cards()
+
+
+async def auto_client(host, port, delay, rng):
+    client = NetClient()
+    await client.connect(host, port)
+    player = asyncio.ensure_future(auto_play(client, delay, rng))
+    await client.run()
+    player.cancel()
+    return client
+
+
+def percentile_ms(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+
+async def loopback(games, delay, inactivity, seed):
+    """Play games one after another between two auto clients over 127.0.0.1 and report latency."""
+    server = Server(inactivity, seed)
+    port = await server.start("127.0.0.1", 0)
+    rng = random.Random(seed)
+    clients = []
+    results = {}
+    start = time.perf_counter()
+    for _ in range(games):
+        pair = await asyncio.gather(auto_client("127.0.0.1", port, delay, random.Random(rng.random())),
+                                    auto_client("127.0.0.1", port, delay, random.Random(rng.random())))
+        clients.extend(pair)
+        outcome = ("unfinished", "seat 0 won", "seat 1 won", "stalled")[pair[0].result]
+        results[outcome] = results.get(outcome, 0) + 1
+    elapsed = time.perf_counter() - start
+    server.server.close()
+
+    rtts = [t for c in clients for t in c.rtts]
+    states = sum(c.states for c in clients)
+    print(f"{games} games in {elapsed:.1f}s: " + ", ".join(f"{k} {v}" for k, v in sorted(results.items())))
+    print(f"{len(rtts)} actions, {sum(c.rejected for c in clients)} rejected (lost a simultaneous drop)")
+    print(f"round trip p50 {percentile_ms(rtts, 50):.3f}  p95 {percentile_ms(rtts, 95):.3f}  "
+          f"p99 {percentile_ms(rtts, 99):.3f} ms")
+    print(f"state messages average {sum(c.state_bytes for c in clients) / max(states, 1):.1f} bytes "
+          f"(full table {HEADER.size + STATE.size + STATE_SIZE} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-player Speed over the network")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="host tables: every two connections get a fresh deal")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--inactivity", type=float, default=DEFAULT_INACTIVITY_SECONDS, help="seconds")
+    loop = sub.add_parser("loopback", help="server + two auto clients in this process, reports round trips")
+    loop.add_argument("--games", type=int, default=10)
+    loop.add_argument("--delay", type=float, default=0.05, help="seconds between each auto client's actions")
+    loop.add_argument("--inactivity", type=float, default=0.5, help="seconds")
+    loop.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        async def serve_forever():
+            server = Server(args.inactivity)
+            port = await server.start(args.host, args.port)
+            print(f"Serving Speed on {args.host}:{port}")
+            await server.server.serve_forever()
+        asyncio.run(serve_forever())
+    else:
+        asyncio.run(loopback(args.games, args.delay, args.inactivity, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Per-phase frame timing for the main loop: rolling histograms, p50/p95/p99 and optional per-frame CSV,
+plus input-to-display latency."""
+import csv, math, time
+from array import array
+
+# log-scale buckets: BUCKETS_PER_OCTAVE per doubling, starting at MIN_US microseconds (~9% resolution)
+BUCKETS_PER_OCTAVE = 8
+MIN_US = 10.0
+NUM_BUCKETS = BUCKETS_PER_OCTAVE * 20     # up to ~10 s
+PERCENTILES = (50, 95, 99)
+
+
+def bucket_of(seconds):
+    us = seconds * 1e6
+    if us <= MIN_US:
+        return 0
+    return min(int(math.log2(us / MIN_US) * BUCKETS_PER_OCTAVE) + 1, NUM_BUCKETS - 1)
+
+
+def bucket_upper_ms(b):
+    """Upper edge of bucket b in milliseconds (what a percentile read from the histogram reports)."""
+    return MIN_US * 2 ** (b / BUCKETS_PER_OCTAVE) / 1000.0
+
+
+class RollingHistogram:
+    """Histogram of the last `window` samples: a ring of bucket indexes plus running bucket counts,
+       so adding a sample and reading a percentile never sort anything. With `seconds`, samples older
+       than that drop out as well (the ring then only caps how many are kept)."""
+
+    def __init__(self, window, seconds=None, clock=time.perf_counter):
+        self.window = window
+        self.seconds = seconds
+        self.clock = clock
+        self.ring = array("H", [0] * window)
+        self.times = array("d", [0.0] * window) if seconds is not None else None
+        self.counts = [0] * NUM_BUCKETS
+        self.n = 0
+        self.pos = 0
+
+    def expire(self):
+        """Drop the samples that have aged out of the time window."""
+        if self.seconds is None:
+            return
+        cutoff = self.clock() - self.seconds
+        while self.n:
+            oldest = (self.pos - self.n) % self.window
+            if self.times[oldest] >= cutoff:
+                break
+            self.counts[self.ring[oldest]] -= 1
+            self.n -= 1
+
+    def add(self, seconds):
+        b = bucket_of(seconds)
+        if self.times is not None:
+            self.expire()
+            self.times[self.pos] = self.clock()
+        if self.n == self.window:
+            self.counts[self.ring[self.pos]] -= 1
+        else:
+            self.n += 1
+        self.ring[self.pos] = b
+        self.counts[b] += 1
+        self.pos = (self.pos + 1) % self.window
+
+    def percentile(self, p):
+        """Approximate p-th percentile in ms (0 if empty)."""
+        self.expire()
+        if not self.n:
+            return 0.0
+        target = math.ceil(self.n * p / 100)
+        seen = 0
+        for b, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return bucket_upper_ms(b)
+        return bucket_upper_ms(NUM_BUCKETS - 1)
+
+
+class FrameProfiler:
+    """Call begin_frame() at the top of the loop, mark(phase) after each phase and end_frame() at the bottom.
+
+    Each mark() charges the time since the previous mark to that phase. The "frame" histogram is the
+    time spent working: phases listed in `idle` (sleeping until there's something to do) are left
+    out of it. The histograms hold the last `window` frames, or with `seconds` the frames of that
+    many seconds (an event-driven loop doesn't run at a fixed rate, so a frame count isn't a time span).
+    While disabled every call returns straight away, so it can stay in the loop permanently.
+
+    Input latency: input(kind, t) when an input event that will change the screen is picked up (t
+    is when the loop woke for it), presented() right after the display update that shows it. The
+    time between goes in the "<kind> in" histogram; several inputs of a kind handled in one frame
+    count once, from the oldest."""
+
+    def __init__(self, phases, window=600, csv_path=None, inputs=(), idle=(), seconds=None):
+        self.phases = list(phases)
+        self.idle = list(idle)
+        self.window = window
+        self.hist = {name: RollingHistogram(window, seconds) for name in ["frame"] + self.phases}
+        self.inputs = list(inputs)
+        for kind in self.inputs:
+            self.hist[f"{kind} in"] = RollingHistogram(window, seconds)
+        self.pending = {}      # input kind -> when the oldest not yet displayed one was picked up
+        self.input_ms = ""     # latency presented this frame, for the CSV
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.enabled = False
+        self.frame = 0
+        self.csv_file = self.csv_writer = None
+        self.frame_start = self.last = 0.0
+        if csv_path:
+            self.open_csv(csv_path)
+
+    def open_csv(self, path):
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(["frame", "frame_ms"] + [f"{p}_ms" for p in self.phases] + ["input_ms"])
+        self.enabled = True
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+
+    def set_enabled(self, on):
+        """Turn sampling on/off (it stays on while streaming to CSV). Takes effect from the next frame."""
+        self.enabled = on or self.csv_writer is not None
+        self.frame_start = 0.0
+        self.pending.clear()
+        for name in self.phases:
+            self.current[name] = 0.0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        if not self.enabled or not self.frame_start:
+            return
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def input(self, kind, t):
+        if self.enabled:
+            self.pending.setdefault(kind, t)
+
+    def presented(self, shown=True):
+        """The display update for everything input() was told about has happened (shown=False: the
+           frame drew nothing, so those inputs had no visible effect and are dropped)."""
+        if not self.pending:
+            return
+        if shown:
+            now = time.perf_counter()
+            oldest = min(self.pending.values())
+            for kind, t in self.pending.items():
+                self.hist[f"{kind} in"].add(now - t)
+            self.input_ms = f"{(now - oldest) * 1000:.3f}"
+        self.pending.clear()
+
+    def end_frame(self):
+        if not self.enabled or not self.frame_start:
+            return
+        current = self.current
+        total = time.perf_counter() - self.frame_start - sum(current[p] for p in self.idle)
+        self.frame += 1
+        self.hist["frame"].add(total)
+        for name in self.phases:
+            self.hist[name].add(current[name])
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([self.frame, f"{total * 1000:.3f}"] + [f"{current[p] * 1000:.3f}" for p in self.phases]
+                                     + [self.input_ms])
+        self.input_ms = ""
+        for name in self.phases:
+            current[name] = 0.0
+
+    def summary_lines(self):
+        """One text line per histogram: name and p50/p95/p99 in ms."""
+        lines = []
+        for name, h in self.hist.items():
+            pct = "  ".join(f"p{p} {h.percentile(p):6.2f}" for p in PERCENTILES)
+            lines.append(f"{name:>8} {pct} ms")
+        return lines
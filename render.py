@@ -0,0 +1,134 @@
+"""Dirty-rectangle renderer: only the parts of the screen that changed since last frame get redrawn and pushed."""
+import pygame
+
+
+class Renderer:
+    """Draws placed_sprites plus a few text labels.
+
+    Every frame it compares each sprite's image/rect with what it drew last time; the old and new
+    rects of anything that moved, appeared or disappeared become dirty. Only dirty regions are
+    cleared, redrawn (clipped) and sent to the display with display.update(rects). When the caller
+    knows only one sprite can have changed (a card being dragged), draw(sprites, moved=s) checks
+    just that one."""
+
+    def __init__(self, screen, bg):
+        self.screen = screen
+        self.bg = bg
+        self.drawn = {}       # id(sprite) -> (sprite, image, rect tuple) as of the last frame
+        self.labels = {}      # key -> [text, surface, rect]
+        self.fonts = {}
+        self.dirty = []
+        self.full = True      # first frame (or after another screen used the display) redraws everything
+
+    def font(self, name, size):
+        f = self.fonts.get((name, size))
+        if f is None:
+            f = self.fonts[(name, size)] = pygame.font.SysFont(name, size)
+        return f
+
+    def invalidate(self):
+        """Redraw the whole screen next frame."""
+        self.full = True
+
+    def mark(self, rect):
+        self.dirty.append(pygame.Rect(rect))
+
+    def label(self, key, text, pos, size=20, color=(255, 255, 255), name="arial", background=None):
+        """Show text at pos. It's only re-rendered (and its area redrawn) when the text changes."""
+        lbl = self.labels.get(key)
+        if lbl is not None and lbl[0] == text and lbl[2].topleft == pos:
+            return
+        surf = self.font(name, size).render(text, True, color, background)
+        rect = surf.get_rect(topleft=pos)
+        if lbl is not None:
+            self.mark(lbl[2])
+        self.labels[key] = [text, surf, rect]
+        self.mark(rect)
+
+    def remove_label(self, key):
+        lbl = self.labels.pop(key, None)
+        if lbl is not None:
+            self.mark(lbl[2])
+
+    def collect(self, sprites):
+        """Diff sprites against last frame, marking old/new rects of anything that changed."""
+        drawn = {}
+        for s in sprites:
+            image, rect = s["image"], s["rect"]
+            key = (rect.x, rect.y, rect.w, rect.h)
+            prev = self.drawn.pop(id(s), None)
+            if prev is None or prev[1] is not image or prev[2] != key:
+                if prev is not None:
+                    self.mark(prev[2])
+                self.mark(rect)
+            drawn[id(s)] = (s, image, key)
+        # whatever is left was removed this frame
+        for _, _, key in self.drawn.values():
+            self.mark(key)
+        self.drawn = drawn
+
+    def collect_one(self, s):
+        """collect() for a frame where s is the only sprite that may have changed."""
+        image, rect = s["image"], s["rect"]
+        key = (rect.x, rect.y, rect.w, rect.h)
+        prev = self.drawn.get(id(s))
+        if prev is None or prev[1] is not image or prev[2] != key:
+            if prev is not None:
+                self.mark(prev[2])
+            self.mark(rect)
+        self.drawn[id(s)] = (s, image, key)
+
+    def merged_dirty(self):
+        """Merge overlapping dirty rects so no area gets redrawn twice."""
+        rects = []
+        for r in self.dirty:
+            i = r.collidelist(rects)
+            while i != -1:
+                r = r.union(rects.pop(i))
+                i = r.collidelist(rects)
+            rects.append(r)
+        return [r.clip(self.screen.get_rect()) for r in rects]
+
+    def draw(self, sprites, moved=None):
+        """Redraw this frame's changes onto the screen surface. Returns the rects to push,
+           or None when the whole screen has to be flipped."""
+        if moved is not None and not self.full:
+            self.collect_one(moved)
+        else:
+            self.collect(sprites)
+        screen = self.screen
+        if self.full:
+            self.full = False
+            self.dirty = []
+            screen.fill(self.bg)
+            for s in sprites:
+                screen.blit(s["image"], s["rect"])
+            for lbl in self.labels.values():
+                screen.blit(lbl[1], lbl[2])
+            return None
+        if not self.dirty:
+            return []
+        rects = self.merged_dirty()
+        self.dirty = []
+        for r in rects:
+            screen.set_clip(r)
+            screen.fill(self.bg, r)
+            for s in sprites:
+                if s["rect"].colliderect(r):
+                    screen.blit(s["image"], s["rect"])
+            for lbl in self.labels.values():
+                if lbl[2].colliderect(r):
+                    screen.blit(lbl[1], lbl[2])
+        screen.set_clip(None)
+        return rects
+
+    def push(self, rects):
+        """Send what draw() produced to the display."""
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+    def present(self, sprites, moved=None):
+        """Draw this frame's changes and push them to the display."""
+        self.push(self.draw(sprites, moved))
@@ -0,0 +1,178 @@
+"""Seeded game recordings and max-speed headless replay.
+
+A recording is the seed and rules the game was dealt with, followed by every engine action in order
+(player plays / draws, center flips, and what the bot did on each of its ticks), each tagged with its
+frame number. Because the bot's choices are recorded rather than re-rolled, a replay doesn't depend on
+timing, the bot's policy or the random generator after the deal.
+
+File layout (little endian):
+    header  magic b"SPDR", version u16, seed u64, bot_delay u16, bot_skip f32, inactivity_threshold u16,
+            seats u8, decks u8, centers u8   (version 1 files stop before the layout: classic table)
+            version 3 only changes the deal (see SpeedGame.deal); 1 and 2 are re-dealt the old way
+    record  frame u32, op u8, a i8, b i8                 (op codes are the OP_* constants in speed.py)
+    end     an OP_END record (a = winner code) followed by a u32 checksum of the final table
+
+    python replay.py game.rec              # replay, check the result, print events/s
+    python replay.py game.rec --repeat 1000
+"""
+import argparse, random, struct, sys, time, zlib
+from speed import (SpeedGame, Layout, OP_PLAY, OP_DRAW, OP_FLIP, OP_BOT_PLAY, OP_BOT_DRAW, OP_BOT_SKIP, OP_END,
+                   BOT, EMPTY, CLASSIC)
+
+MAGIC = b"SPDR"
+VERSION = 3
+HEADER_V1 = struct.Struct("<4sHQHfH")
+HEADER = struct.Struct("<4sHQHfHBBB")
+RECORD = struct.Struct("<IBbb")
+CHECKSUM = struct.Struct("<I")
+WINNER_CODES = {None: 0, "player": 1, "bot": 2}
+WINNER_NAMES = {code: name for name, code in WINNER_CODES.items()}
+
+
+class ReplayError(Exception):
+    pass
+
+
+def new_seed():
+    return random.randrange(1 << 63)
+
+
+def new_game(seed, bot_delay, bot_skip, inactivity_threshold, layout=CLASSIC, legacy_deal=False):
+    """The one way recorded games are dealt, so a seed always gives the same table."""
+    game = SpeedGame(bot_delay=bot_delay, bot_skip=bot_skip, inactivity_threshold=inactivity_threshold,
+                     rng=random.Random(seed), layout=layout)
+    if legacy_deal:
+        game.rng = random.Random(seed)
+        game.deal_legacy()
+    return game
+
+
+def state_checksum(game):
+    """crc32 of the board and every pile, to check a replay ended on exactly the recorded table."""
+    data = bytearray(c - EMPTY for c in game.board)
+    for i in game.layout.back_positions:
+        data.append(255)
+        data.extend(game.piles[i])
+    return zlib.crc32(data)
+
+
+class Recorder:
+    """Install as game.recorder. Records go through a buffered file, so recording costs a struct pack per action."""
+
+    def __init__(self, path, seed, game):
+        self.file = open(path, "wb")
+        layout = game.layout
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, game.bot_delay, game.bot_skip, game.inactivity_threshold,
+                                    layout.seats, layout.decks, layout.centers))
+
+    def __call__(self, frame, op, a, b):
+        self.file.write(RECORD.pack(frame, op, a, b))
+
+    def close(self, game):
+        """Finish the file with the result and a checksum of the final table."""
+        if self.file is None:
+            return
+        self.file.write(RECORD.pack(game.frame, OP_END, WINNER_CODES[game.winner()], 0))
+        self.file.write(CHECKSUM.pack(state_checksum(game)))
+        self.file.close()
+        self.file = None
+
+
+def read_log(path):
+    """Returns (header dict, records as (frame, op, a, b) tuples, end record or None, checksum or None).
+       A log cut short (game killed mid-way) has no end record."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER_V1.size:
+        raise ReplayError(f"{path}: too short for a header")
+    magic, version, seed, bot_delay, bot_skip, threshold = HEADER_V1.unpack_from(data)
+    if magic != MAGIC or not 1 <= version <= VERSION:
+        raise ReplayError(f"{path}: not a version 1-{VERSION} Speed recording")
+    header = dict(seed=seed, bot_delay=bot_delay, bot_skip=bot_skip, inactivity_threshold=threshold, layout=CLASSIC,
+                  legacy_deal=version < 3)
+    size = HEADER_V1.size
+    if version >= 2:
+        if len(data) < HEADER.size:
+            raise ReplayError(f"{path}: too short for a header")
+        seats, decks, centers = HEADER.unpack_from(data)[-3:]
+        try:
+            header["layout"] = Layout(seats, decks, centers)
+        except ValueError as e:
+            raise ReplayError(f"{path}: {e}")
+        size = HEADER.size
+    body = memoryview(data)[size:]
+    n = len(body) // RECORD.size
+    records = list(RECORD.iter_unpack(body[:n * RECORD.size]))
+    end = checksum = None
+    for i, rec in enumerate(records):
+        if rec[1] == OP_END:
+            end = rec
+            rest = body[(i + 1) * RECORD.size:]
+            if len(rest) >= CHECKSUM.size:
+                checksum = CHECKSUM.unpack_from(rest)[0]
+            records = records[:i]
+            break
+    return header, records, end, checksum
+
+
+def apply(game, op, a, b):
+    """Re-execute one recorded action."""
+    if op == OP_PLAY:
+        game.play_card(a, b)
+    elif op == OP_DRAW:
+        game.draw_new_cards(a)
+    elif op == OP_FLIP:
+        game.flip_new_center_cards()
+    elif op == OP_BOT_PLAY:
+        game.bot_play(a, b)
+    elif op == OP_BOT_DRAW:
+        game.bot_draw(a or BOT)     # version 1 files always wrote 0 for the one bot
+    elif op == OP_BOT_SKIP:
+        pass
+    else:
+        raise ReplayError(f"unknown op {op}")
+
+
+def replay(path, log=None):
+    """Replay a recording headlessly. Returns the final game; raises ReplayError if it doesn't end
+       the way the recording says (e.g. a rule change altered the outcome)."""
+    header, records, end, checksum = log or read_log(path)
+    game = new_game(header["seed"], header["bot_delay"], header["bot_skip"], header["inactivity_threshold"],
+                    header["layout"], header["legacy_deal"])
+    for frame, op, a, b in records:
+        game.frame = frame
+        apply(game, op, a, b)
+    if end is not None:
+        game.frame = end[0]
+        winner = game.winner()
+        if WINNER_CODES[winner] != end[2]:
+            raise ReplayError(f"{path}: recorded winner {WINNER_NAMES.get(end[2])}, replay gave {winner}")
+        if checksum is not None and checksum != state_checksum(game):
+            raise ReplayError(f"{path}: final table differs from the recording")
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Speed game headlessly")
+    parser.add_argument("log")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times (benchmarking)")
+    args = parser.parse_args()
+
+    log = read_log(args.log)
+    header, records, end, _ = log
+    start = time.perf_counter()
+    try:
+        for _ in range(args.repeat):
+            game = replay(args.log, log)
+    except ReplayError as e:
+        print(f"MISMATCH: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    status = "complete" if end is not None else "incomplete recording"
+    print(f"seed {header['seed']}: {len(records)} events over {game.frame} frames, winner {game.winner()} ({status})")
+    total = len(records) * args.repeat
+    print(f"replayed {args.repeat}x in {elapsed:.3f}s ({total / elapsed if elapsed else 0:.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
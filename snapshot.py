@@ -0,0 +1,165 @@
+"""Compact binary snapshots of a SpeedGame, for save-games and undo / rewind.
+
+Layout (little endian), about 100 bytes for the classic table:
+    header  magic b"SPDS", version u8, seats u8, decks u8, centers u8, frame u32, bot_timer u16,
+            inactivity_timer u16, bot_delay u16, bot_skip f32, inactivity_threshold u16, rng seed u64
+    board   one i8 per slot of the layout (card, or -1 for an empty slot)
+    piles   for each back position: count u8, then its cards bottom to top
+The hand bitmasks aren't stored: restore rebuilds them from the board.
+
+Snapshots hold no pygame objects, so they are also a cheap way to hand a position to another
+process; within one process SpeedGame.clone() is cheaper still.
+
+    python snapshot.py speed.save        # describe a save file
+"""
+import random, struct, sys
+from array import array
+from collections import deque
+from functools import lru_cache
+from speed import SpeedGame, Layout, EMPTY, CARD_NAMES, DECK
+
+MAGIC = b"SPDS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBIHHHfHQ")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def layout_for(seats, decks, centers):
+    return Layout(seats, decks, centers)
+
+
+def snapshot(game):
+    """Bytes that restore() turns back into this table.
+       Side effect: game.rng is reseeded. A fresh seed is drawn from it, stored in the snapshot and
+       then seeded into game.rng, so a restored game rolls the same dice as this one from here on;
+       taking a snapshot therefore changes what game.rng would have rolled next."""
+    seed = game.rng.getrandbits(64)
+    game.rng.seed(seed)
+    layout = game.layout
+    parts = [HEADER.pack(MAGIC, VERSION, layout.seats, layout.decks, layout.centers, game.frame, game.bot_timer,
+                         game.inactivity_timer, game.bot_delay, game.bot_skip, game.inactivity_threshold, seed),
+             array("b", game.board).tobytes()]
+    for i in layout.back_positions:
+        pile = game.piles[i]
+        parts.append(bytes((len(pile),)))
+        parts.append(bytes(pile))
+    return b"".join(parts)
+
+
+def restore(data, game=None):
+    """The SpeedGame a snapshot was taken of. Given a game, that game is overwritten in place and its
+       hooks (bot_policy, recorder, on_activity, events) are kept, e.g. for undo in the running game."""
+    try:
+        (magic, version, seats, decks, centers, frame, bot_timer, inactivity_timer,
+         bot_delay, bot_skip, threshold, seed) = HEADER.unpack_from(data)
+    except struct.error:
+        raise SnapshotError("too short for a snapshot header")
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError(f"not a version {VERSION} Speed snapshot")
+    try:
+        layout = layout_for(seats, decks, centers)
+    except ValueError as e:
+        raise SnapshotError(str(e))
+    if game is None:
+        game = SpeedGame.__new__(SpeedGame)
+        game.events = None
+        game.bot_policy = game.recorder = game.on_activity = None
+    game.rng = random.Random(seed)
+    game.layout = layout
+    game.frame, game.bot_timer, game.inactivity_timer = frame, bot_timer, inactivity_timer
+    game.bot_delay, game.bot_skip, game.inactivity_threshold = bot_delay, bot_skip, threshold
+
+    n = layout.num_slots
+    pos = HEADER.size + n
+    if len(data) < pos:
+        raise SnapshotError("board cut short")
+    board = array("b", data[HEADER.size:pos])
+    game.board = [EMPTY] * n
+    game.occupied = [0] * seats
+    game.rank_mask = [0] * seats
+    game.rank_slots = [[0] * 14 for _ in range(seats)]
+    for slot, card in enumerate(board):
+        if card == EMPTY:
+            # hands can have gaps, the center piles always show a card
+            if slot in layout.center_slots:
+                raise SnapshotError(f"center slot {slot} is empty")
+            continue
+        if card not in DECK:
+            raise SnapshotError(f"slot {slot} holds {card}, not a card")
+        if layout.hand_of[slot] >= 0:
+            game._put(slot, card)
+        else:
+            game.board[slot] = card
+    game.piles = {}
+    for i in layout.back_positions:
+        if pos >= len(data):
+            raise SnapshotError("piles cut short")
+        count = data[pos]
+        pile = list(data[pos + 1:pos + 1 + count])
+        if len(pile) < count:
+            raise SnapshotError("piles cut short")
+        bad = [card for card in pile if card not in DECK]
+        if bad:
+            raise SnapshotError(f"pile {i} holds {bad[0]}, not a card")
+        game.piles[i] = pile
+        pos += 1 + count
+    if pos != len(data):
+        raise SnapshotError("trailing bytes after the piles")
+    return game
+
+
+class SnapshotRing:
+    """The last `capacity` snapshots of a game, oldest dropped first. push() before a move,
+       undo() to step back over it."""
+
+    def __init__(self, capacity=256):
+        self.ring = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.ring)
+
+    def push(self, game):
+        self.ring.append(snapshot(game))
+
+    def discard(self):
+        """Forget the newest snapshot (the move it was pushed for didn't happen)."""
+        if self.ring:
+            self.ring.pop()
+
+    def undo(self, game, steps=1):
+        """Put game back to the state from `steps` pushes ago (dropping the newer ones).
+           Returns False, leaving game alone, if the ring doesn't go back that far."""
+        if not 1 <= steps <= len(self.ring):
+            return False
+        for _ in range(steps - 1):
+            self.ring.pop()
+        restore(self.ring.pop(), game)
+        return True
+
+    def clear(self):
+        self.ring.clear()
+
+
+def main():
+    with open(sys.argv[1], "rb") as f:
+        data = f.read()
+    try:
+        game = restore(data)
+    except SnapshotError as e:
+        print(f"{sys.argv[1]}: {e}")
+        sys.exit(1)
+    layout = game.layout
+    print(f"{len(data)} bytes: {layout.seats} seats, {layout.decks} deck(s), {layout.centers} centers, frame {game.frame}")
+    print("centers:", " ".join(CARD_NAMES[c] for c in (game.board[s] for s in layout.center_slots)))
+    for seat, hand in enumerate(layout.hand_slots):
+        cards = " ".join(CARD_NAMES[game.board[s]] if game.board[s] != EMPTY else "--" for s in hand)
+        print(f"seat {seat}: {cards}   pile {len(game.piles[layout.hand_piles[seat]])}")
+    print("winner:", game.winner())
+
+
+if __name__ == "__main__":
+    main()
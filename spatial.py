@@ -0,0 +1,52 @@
+"""Uniform grid over the screen for point lookups (card hit-testing, drop snap targets)."""
+import math
+
+
+class SpatialGrid:
+    """Buckets items by every grid cell their rect overlaps.
+
+    A point query only looks at the one cell under the point, so it costs as much as the number of
+    cards stacked there, not the number on the table. Items within a cell are kept in insertion
+    order, which callers use as draw order (last = on top)."""
+
+    def __init__(self, cell=64):
+        self.cell = cell
+        self.cells = {}       # (cx, cy) -> [(item, rect), ...]
+
+    def _cells(self, rect):
+        x, y, w, h = rect
+        c = self.cell
+        for cx in range(x // c, (x + max(w, 1) - 1) // c + 1):
+            for cy in range(y // c, (y + max(h, 1) - 1) // c + 1):
+                yield cx, cy
+
+    def insert(self, item, rect):
+        rect = tuple(rect)
+        for key in self._cells(rect):
+            self.cells.setdefault(key, []).append((item, rect))
+
+    def at(self, pos):
+        """Items whose rect contains pos, bottom to top."""
+        x, y = pos
+        bucket = self.cells.get((x // self.cell, y // self.cell), ())
+        return [item for item, (rx, ry, w, h) in bucket if rx <= x < rx + w and ry <= y < ry + h]
+
+    def nearest(self, pos, radius):
+        """(item, distance) of the item whose rect center is closest to pos, if it is within radius;
+           (None, inf) otherwise. Only the cells the radius reaches are looked at."""
+        x, y = pos
+        c = self.cell
+        best, best_dist = None, math.inf
+        seen = set()
+        for cx in range(int(x - radius) // c, int(x + radius) // c + 1):
+            for cy in range(int(y - radius) // c, int(y + radius) // c + 1):
+                for item, (rx, ry, w, h) in self.cells.get((cx, cy), ()):
+                    if item in seen:
+                        continue
+                    seen.add(item)
+                    dist = math.hypot(x - (rx + w // 2), y - (ry + h // 2))
+                    if dist < best_dist:
+                        best, best_dist = item, dist
+        if best_dist >= radius:
+            return None, math.inf
+        return best, best_dist
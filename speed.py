@@ -0,0 +1,538 @@
+"""Headless Speed rules engine. No pygame in here so games can run without a display."""
+import random
+from eventlog import DEBUG, INFO
+
+# ---------------- RULES CONFIG ----------------
+FPS = 60
+DEFAULT_INACTIVITY_SECONDS = 2.5
+BOT_DELAY = 90
+# difficulty -> (bot delay in frames, chance the bot skips its turn)
+DIFFICULTIES = {
+    "easy": (180, 0.5),
+    "medium": (90, 0.0),
+    "hard": (45, 0.0),
+    "expert": (45, 0.0),   # hard timing plus the search bot from expert.py
+}
+# ----------------------------------------------
+
+suits = ["spades", "clubs", "diamonds", "hearts"]
+values = ["ace", "2", "3", "4", "5", "6", "7", "8", "9", "10", "jack", "queen", "king"]
+
+# cards are small ints: card = (rank - 1) * 4 + suit index, rank 1 (ace) .. 13 (king)
+EMPTY = -1
+DECK = range(len(values) * len(suits))
+# CARD_NAMES[card] -> "1_of_spades", "11_of_hearts", etc. (same as the sprite keys in main.py)
+CARD_NAMES = [f"{card // 4 + 1}_of_{suits[card % 4]}" for card in DECK]
+CARD_RANKS = [card // 4 + 1 for card in DECK]
+
+# slot indexes, one per entry of the cardPos list in main.py
+PLAY_LEFT, PLAY_RIGHT = 0, 1
+CENTER_PILE_LEFT, CENTER_PILE_RIGHT = 2, 3   # feed PLAY_LEFT / PLAY_RIGHT on a flip
+PLAYER_HAND = range(4, 9)
+PLAYER_PILE = 9
+BOT_HAND = range(10, 15)
+BOT_PILE = 15
+NUM_SLOTS = 16
+BACK_POSITIONS = (2, 3, 9, 15)
+PILE_SIZES = {2: 5, 3: 5, 9: 15, 15: 15}
+HAND_SIZE = 5
+PLAYER, BOT = 0, 1                        # hand indexes
+HAND_SLOTS = (PLAYER_HAND, BOT_HAND)
+HAND_PILES = (PLAYER_PILE, BOT_PILE)
+FULL_HAND = (1 << HAND_SIZE) - 1
+
+# recorded engine actions (see SpeedGame.recorder / replay.py): op codes, each with two small args
+OP_PLAY, OP_DRAW, OP_FLIP, OP_BOT_PLAY, OP_BOT_DRAW, OP_BOT_SKIP, OP_END = range(1, 8)
+
+# ------------------ move tables ------------------
+# PLAYABLE[a][b]: a card of rank a can go on a center card of rank b (one up/down, ace <-> king wraps)
+RANKS = range(1, len(values) + 1)
+PLAYABLE = [[a in RANKS and b in RANKS and (abs(a - b) == 1 or {a, b} == {1, 13}) for b in range(14)] for a in range(14)]
+# NEIGHBORS[b]: bitmask (bit = rank) of every rank playable on a center of rank b
+NEIGHBORS = [sum(1 << a for a in RANKS if PLAYABLE[a][b]) for b in range(14)]
+# SLOT_LISTS[mask]: hand positions (0-4) set in a 5-bit mask; FIRST_FREE[mask]: lowest clear position
+SLOT_LISTS = [tuple(p for p in range(HAND_SIZE) if mask >> p & 1) for mask in range(FULL_HAND + 1)]
+FIRST_FREE = [next((p for p in range(HAND_SIZE) if not mask >> p & 1), -1) for mask in range(FULL_HAND + 1)]
+
+
+def find_move(rank_mask, rank_slots, centers, rng=None):
+    """The move generator shared by every bot/simulation.
+
+    rank_mask has a bit per rank in the hand and rank_slots[rank] a bit per hand position holding
+    that rank; centers holds each center's rank. Returns (hand position, side) for a playable card,
+    picked at random if rng is given, or None. The side is the first center the card fits, so on
+    the classic table a card that fits both goes on the left, like the original bot."""
+    reach = 0
+    for rank in centers:
+        reach |= NEIGHBORS[rank]
+    playable = rank_mask & reach
+    if not playable:
+        return None
+    # union of the hand positions holding a playable rank
+    slots = 0
+    m = playable
+    while m:
+        low = m & -m
+        slots |= rank_slots[low.bit_length() - 1]
+        m ^= low
+    choices = SLOT_LISTS[slots]
+    pos = choices[0] if rng is None or len(choices) == 1 else rng.choice(choices)
+    # find that position's rank bit to decide the side
+    m = playable
+    while not rank_slots[(m & -m).bit_length() - 1] >> pos & 1:
+        m &= m - 1
+    bit = m & -m
+    side = 0
+    while not NEIGHBORS[centers[side]] & bit:
+        side += 1
+    return pos, side
+
+
+def side_name(side):
+    return ("left", "right")[side] if side < 2 else f"center {side + 1}"
+
+
+class Layout:
+    """Slot indexes for a table variant: how many seats, decks and center piles.
+
+    Slots go: the face up centers, the pile feeding each center, then every seat's hand followed
+    by its draw pile. Seat 0 is the player and the rest are bots. The default (2 seats, 1 deck,
+    2 centers) is exactly the classic 16-slot board the constants above describe."""
+
+    def __init__(self, seats=2, decks=1, centers=2, center_pile_size=5):
+        if not 2 <= seats <= 4 or not 1 <= decks <= 4 or not 2 <= centers <= 6:
+            raise ValueError("a table has 2-4 seats, 1-4 decks and 2-6 centers")
+        self.seats, self.decks, self.centers = seats, decks, centers
+        self.center_slots = range(centers)
+        self.center_piles = range(centers, 2 * centers)
+        first = 2 * centers
+        self.hand_slots = tuple(range(first + s * (HAND_SIZE + 1), first + s * (HAND_SIZE + 1) + HAND_SIZE)
+                                for s in range(seats))
+        self.hand_piles = tuple(hand.stop for hand in self.hand_slots)
+        self.num_slots = first + seats * (HAND_SIZE + 1)
+        self.back_positions = (*self.center_piles, *self.hand_piles)
+        self.seat_piles = tuple(enumerate(self.hand_piles))
+        self.center_feeds = tuple(zip(self.center_slots, self.center_piles))
+        self.bot_seats = range(1, seats)
+        # cards left after the centers and their piles are split evenly between the seats
+        per_seat = (len(DECK) * decks - centers * (1 + center_pile_size)) // seats - HAND_SIZE
+        if per_seat < 1:
+            raise ValueError("not enough cards for this layout")
+        self.pile_sizes = {**{i: center_pile_size for i in self.center_piles}, **{i: per_seat for i in self.hand_piles}}
+        # per slot: the seat whose hand it is in (-1 if none) and its bit in that hand's masks
+        self.hand_of = [-1] * self.num_slots
+        self.bit_of = [0] * self.num_slots
+        for seat, hand in enumerate(self.hand_slots):
+            for pos, slot in enumerate(hand):
+                self.hand_of[slot] = seat
+                self.bit_of[slot] = 1 << pos
+        self.classic_slots = (seats, centers) == (2, 2)
+        self.classic = self.classic_slots and (decks, center_pile_size) == (1, PILE_SIZES[CENTER_PILE_LEFT])
+
+
+CLASSIC = Layout()
+
+
+class SpeedGame:
+    """Whole table state plus the rules. The pygame front-end in main.py just draws this.
+
+    board holds one card (or EMPTY) per slot of the layout (cardPos for the classic one); piles maps
+    each back position to its stack of cards (top of the pile is the end of the list). Each hand
+    (PLAYER / BOT, and further bot seats on bigger layouts) also keeps bitmasks so the rules never
+    have to look through the slots:
+      occupied[hand]          bit per hand position that holds a card
+      rank_mask[hand]         bit per rank present in the hand
+      rank_slots[hand][rank]  bit per hand position holding that rank"""
+
+    def __init__(self, bot_delay=BOT_DELAY, bot_skip=0.0,
+                 inactivity_threshold=int(DEFAULT_INACTIVITY_SECONDS * FPS), rng=None, layout=CLASSIC):
+        self.rng = rng or random.Random()
+        self.layout = layout
+        self.bot_delay = bot_delay
+        self.bot_skip = bot_skip
+        self.inactivity_threshold = inactivity_threshold
+        # optional eventlog.EventLog told about plays, draws, flips and bot moves (see main.py)
+        self.events = None
+        # optional callable(game) -> (slot, side) or None that picks the bot's move (see expert.py)
+        self.bot_policy = None
+        # optional callable(frame, op, a, b) told about every action, in order (see replay.py)
+        self.recorder = None
+        # optional callable() run whenever a play or flip resets the inactivity timer (see main.py)
+        self.on_activity = None
+        self.deal()
+
+    def record(self, op, a=0, b=0):
+        if self.recorder is not None:
+            self.recorder(self.frame, op, a, b)
+
+    def set_difficulty(self, difficulty):
+        self.bot_delay, self.bot_skip = DIFFICULTIES[difficulty]
+
+    # ------------------ setup ------------------
+
+    def deal(self):
+        """Shuffle and lay out a fresh table, resetting the timers. Piles, centers and hands all come
+           off the one shuffled deck, so every card is on the table exactly once (per deck)."""
+        cards = list(DECK) * self.layout.decks
+        self.rng.shuffle(cards)
+        self._lay_out(cards, cards)
+
+    def deal_legacy(self):
+        """The original deal, where the face up cards came from a second, independent shuffle (so a card
+           could be face up and in a pile at once). Only for re-dealing old recordings (see replay.py)."""
+        cards = list(DECK) * self.layout.decks
+        self.rng.shuffle(cards)
+        fronts = list(DECK) * self.layout.decks
+        self.rng.shuffle(fronts)
+        self._lay_out(cards, fronts)
+
+    def _lay_out(self, cards, fronts):
+        """Piles off the end of cards, then the centers and hands off the end of fronts."""
+        layout = self.layout
+        self.piles = {}
+        for pos_index, size in layout.pile_sizes.items():
+            self.piles[pos_index] = [cards.pop() for _ in range(min(size, len(cards)))]
+        self.board = [EMPTY] * layout.num_slots
+        self.occupied = [0] * layout.seats
+        self.rank_mask = [0] * layout.seats
+        self.rank_slots = [[0] * 14 for _ in range(layout.seats)]
+        for slot in layout.center_slots:
+            self.board[slot] = fronts.pop()
+        for hand in layout.hand_slots:
+            for slot in hand:
+                self._put(slot, fronts.pop())
+        self.bot_timer = 0
+        self.inactivity_timer = 0
+        self.frame = 0
+
+    def clone(self, rng=None):
+        """Independent copy of the table and timers (no policy or event log), e.g. for search."""
+        other = SpeedGame.__new__(SpeedGame)
+        other.rng = rng or random.Random()
+        other.layout = self.layout
+        other.bot_delay = self.bot_delay
+        other.bot_skip = self.bot_skip
+        other.inactivity_threshold = self.inactivity_threshold
+        other.events = None
+        other.bot_policy = None
+        other.recorder = None
+        other.on_activity = None
+        other.frame = self.frame
+        other.board = self.board[:]
+        other.piles = {i: pile[:] for i, pile in self.piles.items()}
+        other.occupied = self.occupied[:]
+        other.rank_mask = self.rank_mask[:]
+        other.rank_slots = [slots[:] for slots in self.rank_slots]
+        other.bot_timer = self.bot_timer
+        other.inactivity_timer = self.inactivity_timer
+        return other
+
+    # ------------------ hand bookkeeping ------------------
+
+    def _put(self, slot, card):
+        """Place card into an (empty) hand slot."""
+        layout = self.layout
+        hand = layout.hand_of[slot]
+        bit = layout.bit_of[slot]
+        rank = CARD_RANKS[card]
+        self.board[slot] = card
+        self.occupied[hand] |= bit
+        self.rank_slots[hand][rank] |= bit
+        self.rank_mask[hand] |= 1 << rank
+
+    def _take(self, slot):
+        """Remove and return the card in a hand slot."""
+        layout = self.layout
+        hand = layout.hand_of[slot]
+        bit = layout.bit_of[slot]
+        card = self.board[slot]
+        rank = CARD_RANKS[card]
+        self.board[slot] = EMPTY
+        self.occupied[hand] &= ~bit
+        slots = self.rank_slots[hand]
+        slots[rank] &= ~bit
+        if not slots[rank]:
+            self.rank_mask[hand] &= ~(1 << rank)
+        return card
+
+    # ------------------ queries ------------------
+
+    def center_values(self):
+        board = self.board
+        return [CARD_RANKS[board[slot]] for slot in self.layout.center_slots]
+
+    def pile_visible(self, pos_index):
+        """A pile's back card is drawn as long as the pile still has cards."""
+        return bool(self.piles[pos_index])
+
+    def winner(self):
+        """Return 'player' or 'bot' (any bot seat) or None if no winner."""
+        occupied, piles = self.occupied, self.piles
+        if self.layout.classic_slots:
+            # hot path (every simulated step asks): the classic two seats without the loop
+            if not occupied[PLAYER] and not piles[PLAYER_PILE]:
+                return "player"
+            if not occupied[BOT] and not piles[BOT_PILE]:
+                return "bot"
+            return None
+        for seat, pile in self.layout.seat_piles:
+            if not occupied[seat] and not piles[pile]:
+                return "player" if seat == PLAYER else "bot"
+        return None
+
+    def find_move(self, hand, rng=None):
+        """(slot, side) of a legal play for hand, or None."""
+        board = self.board
+        # the classic two centers without center_values()'s loop: this runs on every bot turn
+        centers = ((CARD_RANKS[board[PLAY_LEFT]], CARD_RANKS[board[PLAY_RIGHT]]) if self.layout.centers == 2
+                   else self.center_values())
+        move = find_move(self.rank_mask[hand], self.rank_slots[hand], centers, rng)
+        if move is None:
+            return None
+        return self.layout.hand_slots[hand][move[0]], move[1]
+
+    def has_move(self, hand):
+        board = self.board
+        reach = 0
+        for slot in self.layout.center_slots:
+            reach |= NEIGHBORS[CARD_RANKS[board[slot]]]
+        return bool(self.rank_mask[hand] & reach)
+
+    def is_stalled(self):
+        """True when nothing can ever change again: no center flips left and nobody has a move or a draw."""
+        layout = self.layout
+        for i in layout.center_piles:
+            if not self.piles[i]:
+                break
+        else:
+            return False
+        for hand in range(layout.seats):
+            if self.occupied[hand] != FULL_HAND and self.piles[layout.hand_piles[hand]]:
+                return False
+            if self.has_move(hand):
+                return False
+        return True
+
+    # ------------------ moves ------------------
+
+    def _move_to_center(self, slot, side):
+        card = self._take(slot)
+        self.board[side] = card
+        self.reset_inactivity()
+        return card
+
+    def reset_inactivity(self):
+        self.inactivity_timer = 0
+        if self.on_activity is not None:
+            self.on_activity()
+
+    def play_card(self, slot, side):
+        """Player drops the card in hand slot onto center side (0 left, 1 right). Returns True if it was legal.
+           The slot can be in any hand (the second seat in a network game plays the bot's hand)."""
+        self.record(OP_PLAY, slot, side)
+        card = self.board[slot]
+        if card == EMPTY or self.layout.hand_of[slot] < 0 or side >= self.layout.centers:
+            return False
+        if not PLAYABLE[CARD_RANKS[card]][CARD_RANKS[self.board[side]]]:
+            return False
+        self._move_to_center(slot, side)
+        if self.events is not None:
+            self.events.emit(INFO, "play", frame=self.frame, seat=self.layout.hand_of[slot], card=CARD_NAMES[card],
+                             side=side_name(side), centers=self.center_values())
+        return True
+
+    def draw_new_cards(self, hand=PLAYER):
+        """Player clicked pile 9: fill the empty player hand slots from it (or hand's own pile)."""
+        self.record(OP_DRAW, hand)
+        pile = self.piles[self.layout.hand_piles[hand]]
+        if not pile:
+            if self.events is not None:
+                self.events.emit(INFO, "pile_empty", frame=self.frame, seat=hand)
+            return False
+        drew = False
+        debug = self.events is not None and self.events.enabled(DEBUG)
+        for pos in SLOT_LISTS[FULL_HAND & ~self.occupied[hand]]:
+            if not pile:
+                break
+            slot = self.layout.hand_slots[hand][pos]
+            self._put(slot, pile.pop())
+            drew = True
+            if debug:
+                self.events.emit(DEBUG, "draw", frame=self.frame, seat=hand, slot=slot, card=CARD_NAMES[self.board[slot]])
+        return drew
+
+    # ------------------ bot ------------------
+
+    def refill_bot_hand(self, slot=None, hand=BOT):
+        """Refill one bot hand slot from its pile. If slot is None, fill the first empty one of hand."""
+        if slot is not None:
+            hand = self.layout.hand_of[slot]
+        pile = self.piles[self.layout.hand_piles[hand]]
+        if not pile or self.occupied[hand] == FULL_HAND:
+            return False
+        if slot is None:
+            slot = self.layout.hand_slots[hand][FIRST_FREE[self.occupied[hand]]]
+        self._put(slot, pile.pop())
+        return True
+
+    def bot_play(self, slot, side):
+        """Bot plays the card in slot onto side and refills that slot."""
+        card = self._move_to_center(slot, side)
+        self.refill_bot_hand(slot)
+        if self.events is not None:
+            self.events.emit(INFO, "play", frame=self.frame, seat=self.layout.hand_of[slot], card=CARD_NAMES[card],
+                             side=side_name(side), centers=self.center_values())
+        return True
+
+    def bot_take_turn(self, hand=BOT):
+        """Bot attempts to play one valid card, else draws. Resets inactivity timer on a successful play.
+           bot_policy only drives the classic BOT seat."""
+        if self.bot_policy is not None and hand == BOT:
+            move = self.bot_policy(self)
+        else:
+            move = self.find_move(hand, self.rng)
+        if move is not None:
+            self.record(OP_BOT_PLAY, *move)
+            return self.bot_play(*move)
+        self.record(OP_BOT_DRAW, hand)
+        self.bot_draw(hand)
+        return False
+
+    def bot_draw(self, hand=BOT):
+        """Nothing playable -> draw one card into bot hand."""
+        if self.piles[self.layout.hand_piles[hand]]:
+            # a full hand draws nothing, so there's nothing to log either
+            if self.refill_bot_hand(None, hand) and self.events is not None and self.events.enabled(DEBUG):
+                self.events.emit(DEBUG, "bot_draw", frame=self.frame, seat=hand)
+        elif self.events is not None:
+            self.events.emit(INFO, "pile_empty", frame=self.frame, seat=hand)
+
+    def bot_tick(self):
+        """The bots' timer went off: each bot seat takes a turn, unless it skips it (easy skips half of them).
+           Returns True if any of them did."""
+        took = False
+        for hand in self.layout.bot_seats:
+            if self.bot_skip and self.rng.random() < self.bot_skip:
+                self.record(OP_BOT_SKIP, hand)
+                continue
+            self.bot_take_turn(hand)
+            took = True
+        return took
+
+    # ------------------ center ------------------
+
+    def flip_new_center_cards(self):
+        """Flip the top card of every center pile onto its center (if they all have one).
+           If any pile empties, all of them are dropped."""
+        self.record(OP_FLIP)
+        piles, board = self.piles, self.board
+        feeds = self.layout.center_feeds
+        for _, i in feeds:
+            if not piles[i]:
+                self.drop_center_piles()
+                if self.events is not None:
+                    self.events.emit(INFO, "centers_dropped", frame=self.frame, reason="empty")
+                return False
+        for slot, i in feeds:
+            board[slot] = piles[i].pop()
+        self.reset_inactivity()
+        if self.events is not None:
+            self.events.emit(INFO, "flip", frame=self.frame, centers=self.center_values())
+        for _, i in feeds:
+            if not piles[i]:
+                self.drop_center_piles()
+                if self.events is not None:
+                    self.events.emit(INFO, "centers_dropped", frame=self.frame, reason="depleted")
+                break
+        return True
+
+    def drop_center_piles(self):
+        for i in self.layout.center_piles:
+            self.piles[i].clear()
+
+    # ------------------ timing ------------------
+
+    def tick(self, dragging=False):
+        """Advance the bot and inactivity timers by one frame. Returns True if the table changed."""
+        changed = False
+        self.frame += 1
+        self.bot_timer += 1
+        if self.bot_timer >= self.bot_delay:
+            changed = self.bot_tick()
+            self.bot_timer = 0
+        # inactivity only counts while the player isn't holding a card (prevents false win)
+        if not dragging:
+            self.inactivity_timer += 1
+        if self.inactivity_timer >= self.inactivity_threshold:
+            if self.events is not None:
+                self.events.emit(INFO, "inactivity", frame=self.frame)
+            self.flip_new_center_cards()
+            self.inactivity_timer = 0
+            changed = True
+        return changed
+
+    # ------------------ headless auto player ------------------
+
+    def player_take_turn(self):
+        """Simple stand-in for a human: play any legal card, else draw into empty slots."""
+        move = self.find_move(PLAYER, self.rng)
+        if move is not None:
+            return self.play_card(*move)
+        if self.occupied[PLAYER] != FULL_HAND:
+            return self.draw_new_cards()
+        return False
+
+
+class AutoMatch:
+    """A bot-vs-bot game advanced one event at a time. The player side acts every player_delay
+       frames (skipping a player_skip fraction of its turns), the bot side per the game's settings.
+       play_headless runs one straight to the end; host.py interleaves thousands of them."""
+
+    def __init__(self, game, player_delay=BOT_DELAY, player_skip=0.0):
+        self.game = game
+        self.player_delay = player_delay
+        self.player_skip = player_skip
+        self.player_timer = 0
+        self.frames = 0
+        self.winner = None
+        self.over = False
+
+    def next_step(self):
+        """Frames until the next player action, bot action or inactivity flip."""
+        game = self.game
+        return max(min(self.player_delay - self.player_timer,
+                       game.bot_delay - game.bot_timer,
+                       game.inactivity_threshold - game.inactivity_timer), 1)
+
+    def step(self):
+        """Skip straight to the next frame where something happens and play it. Returns the frames advanced;
+           afterwards over is set if the game was won (see winner) or stalled."""
+        game = self.game
+        step = self.next_step()
+        self.frames += step
+        self.player_timer += step
+        game.frame += step - 1
+        game.bot_timer += step - 1
+        game.inactivity_timer += step - 1
+        # same order as the main loop: input first, then the bot / inactivity tick
+        if self.player_timer >= self.player_delay:
+            self.player_timer = 0
+            if not self.player_skip or game.rng.random() >= self.player_skip:
+                game.player_take_turn()
+            self.winner = game.winner()
+            if self.winner:
+                self.over = True
+                return step
+        game.tick()
+        self.winner = game.winner()
+        self.over = bool(self.winner) or game.is_stalled()
+        return step
+
+
+def play_headless(game, player_delay=BOT_DELAY, player_skip=0.0, max_frames=FPS * 60 * 10):
+    """Run a bot-vs-bot game to the end without a display (see AutoMatch).
+       Returns (winner, frames); winner is None if the table stalled or max_frames ran out."""
+    match = AutoMatch(game, player_delay, player_skip)
+    while not match.over and match.frames < max_frames:
+        match.step()
+    return match.winner, match.frames
@@ -0,0 +1,52 @@
+import asyncio, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from netplay import Server, NetClient
+
+
+async def dropped_waiting_client():
+    server = Server(seed=1)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        # first client connects and hangs up before anyone else arrives
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await asyncio.sleep(0.05)
+        writer.close()
+        await asyncio.sleep(0.05)
+        assert server.waiting is None
+
+        # the next two must be paired with each other, not with the dead socket
+        a, b = NetClient(), NetClient()
+        await asyncio.wait_for(asyncio.gather(a.connect("127.0.0.1", port), b.connect("127.0.0.1", port)), 5)
+        assert sorted((a.seat, b.seat)) == [0, 1]
+        assert a.result == b.result == 0
+        assert len(server.tables) == 1 and not server.tables[0].result
+        a.close()
+        b.close()
+    finally:
+        server.server.close()
+
+
+def test_dropped_waiting_client_is_not_paired():
+    asyncio.run(dropped_waiting_client())
+
+
+class Writer:
+    def write(self, data):
+        raise AssertionError("written on the game thread")
+
+    def close(self):
+        raise AssertionError("closed on the game thread")
+
+
+def test_send_after_the_loop_closed():
+    # the server hung up and the network thread finished before the game noticed
+    client = NetClient()
+    client.inbox = object()
+    client.writer = Writer()
+    client.loop = asyncio.new_event_loop()
+    client.loop.close()
+    client.send(1, b"x")
+    client.close()
+    client.closed = True
+    client.send(1, b"x")
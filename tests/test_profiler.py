@@ -0,0 +1,25 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiler import RollingHistogram
+
+
+def test_samples_age_out():
+    now = [0.0]
+    h = RollingHistogram(100, seconds=10, clock=lambda: now[0])
+    h.add(0.050)
+    now[0] = 5.0
+    h.add(0.001)
+    assert h.n == 2 and h.percentile(99) > 40
+    # the slow frame is more than 10 s old now, however few frames came since
+    now[0] = 12.0
+    assert h.percentile(99) < 2
+    now[0] = 30.0
+    assert h.percentile(50) == 0.0
+
+
+def test_count_window():
+    h = RollingHistogram(3)
+    for ms in (50, 1, 1, 1):
+        h.add(ms / 1000)
+    assert h.n == 3 and h.percentile(99) < 2
@@ -0,0 +1,44 @@
+import os, random, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from speed import SpeedGame, DECK
+from snapshot import HEADER, SnapshotError, snapshot, restore
+
+
+def saved():
+    return snapshot(SpeedGame(rng=random.Random(7)))
+
+
+def test_round_trip():
+    game = SpeedGame(rng=random.Random(7))
+    data = snapshot(game)
+    again = restore(data)
+    assert again.board == game.board and again.piles == game.piles
+
+
+def test_truncated():
+    data = saved()
+    for size in (0, HEADER.size - 1, HEADER.size + 3, len(data) - 1):
+        with pytest.raises(SnapshotError):
+            restore(data[:size])
+
+
+def test_out_of_range_card():
+    data = bytearray(saved())
+    # a hand slot (board byte past the centers) and the last pile card
+    data[HEADER.size + 4] = len(DECK)
+    with pytest.raises(SnapshotError):
+        restore(bytes(data))
+    data = bytearray(saved())
+    data[-1] = 200
+    with pytest.raises(SnapshotError):
+        restore(bytes(data))
+
+
+def test_empty_center():
+    data = bytearray(saved())
+    data[HEADER.size] = 0xff      # -1: empty
+    with pytest.raises(SnapshotError):
+        restore(bytes(data))
@@ -0,0 +1,45 @@
+import os, random, sys
+
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from speed import SpeedGame, Layout, PLAYER, CARD_NAMES
+from view import TableView, table_positions
+
+CARD = (50, 70)
+
+
+def plain_cards():
+    return {name: pygame.Surface(CARD) for name in ["cardback"] + CARD_NAMES}
+
+
+def center_of(view, slot):
+    x, y = view.positions[slot]
+    return x + CARD[0] // 2, y + CARD[1] // 2
+
+
+def test_drag_and_draw_with_four_centers():
+    layout = Layout(2, 1, 4)
+    # a deal where the player has a play straight away
+    for seed in range(100):
+        game = SpeedGame(rng=random.Random(seed), layout=layout)
+        move = game.find_move(PLAYER)
+        if move is not None:
+            break
+    view = TableView(game, plain_cards(), table_positions(layout, CARD, 1075, 800))
+    view.sync()
+    assert sorted(s["slot"] for s in view.placed_sprites if s["draggable"]) == list(layout.hand_slots[0])
+
+    # drag the playable card onto its center
+    slot, side = move
+    sprite = view.sprite_at(center_of(view, slot))
+    assert sprite["draggable"] and sprite["slot"] == slot
+    assert view.snap_target(center_of(view, side), 30) == side
+    assert game.play_card(sprite["slot"], side)
+    view.sync()
+
+    # click the player's own pile to fill the gap
+    pile = view.sprite_at(center_of(view, layout.hand_piles[0]))
+    assert pile["is_back"] and pile["pile_index"] == view.own_pile
+    assert game.draw_new_cards()
+    assert game.board[slot] != -1
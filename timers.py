@@ -0,0 +1,62 @@
+"""Monotonic-clock timer queue for the main loop (bot moves, inactivity flips, label refreshes)."""
+import heapq, itertools, math, time
+
+
+class Scheduler:
+    """Named one-shot timers on a heap of deadlines. Scheduling a name again replaces its old deadline
+       (the stale heap entry is skipped when it comes up), so rescheduling is O(log n) with no search."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.heap = []                  # (deadline, seq, name)
+        self.live = {}                  # name -> (deadline, seq) of its current timer
+        self.seq = itertools.count()
+
+    def now(self):
+        return self.clock()
+
+    def at(self, name, deadline):
+        seq = next(self.seq)
+        self.live[name] = (deadline, seq)
+        heapq.heappush(self.heap, (deadline, seq, name))
+
+    def schedule(self, name, delay):
+        self.at(name, self.clock() + delay)
+
+    def cancel(self, name):
+        self.live.pop(name, None)
+
+    def remaining(self, name):
+        """Seconds until name fires (0 if overdue), or None if it isn't scheduled."""
+        entry = self.live.get(name)
+        return max(entry[0] - self.clock(), 0.0) if entry else None
+
+    def _drop_stale(self):
+        heap, live = self.heap, self.live
+        while heap and live.get(heap[0][2], (None, None))[1] != heap[0][1]:
+            heapq.heappop(heap)
+
+    def next_deadline(self):
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def timeout_ms(self):
+        """Milliseconds to wait for input before the next timer is due: None if there are no timers,
+           0 if one is already due."""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        delta = deadline - self.clock()
+        return math.ceil(delta * 1000) if delta > 0 else 0
+
+    def pop_due(self):
+        """Names of every timer that is due, earliest first, each with the deadline it was due at."""
+        now = self.clock()
+        due = []
+        while True:
+            self._drop_stale()
+            if not self.heap or self.heap[0][0] > now:
+                return due
+            deadline, _, name = heapq.heappop(self.heap)
+            del self.live[name]
+            due.append((name, deadline))
@@ -0,0 +1,149 @@
+"""Sprites for a SpeedGame table: one per cardPos slot, only rebuilt when that slot's card changes."""
+from speed import NUM_SLOTS, EMPTY, CARD_NAMES
+from spatial import SpatialGrid
+
+# positions (index comments for clarity)
+cardPos = [
+    (350, 285),     # 0 play left
+    (550, 285),     # 1 play right
+    (150, 285),     # 2 center back right (pile)
+    (750, 285),     # 3 center back left (pile)
+    (25, 555),      # 4 player hand 1
+    (200, 555),     # 5 player hand 2
+    (375, 555),     # 6 player hand 3
+    (550, 555),     # 7 player hand 4
+    (725, 555),     # 8 player hand 5
+    (900, 555),     # 9 player draw pile (back)
+    (25, 25),       # 10 bot hand 1
+    (200, 25),      # 11 bot hand 2
+    (375, 25),      # 12 bot hand 3
+    (550, 25),      # 13 bot hand 4
+    (725, 25),      # 14 bot hand 5
+    (900, 25)       # 15 bot draw pile (back)
+]
+
+BACK = -2   # slot_cards value for a pile's back card
+
+# the second seat of a network game sees the table turned around: its own hand (10-14) and pile (15) at the bottom
+SEAT_SWAP = [0, 1, 2, 3, 10, 11, 12, 13, 14, 15, 4, 5, 6, 7, 8, 9]
+SEAT1_POS = [cardPos[SEAT_SWAP[slot]] for slot in range(NUM_SLOTS)]
+
+
+def table_positions(layout, card_size, width, height, gap=10):
+    """Top-left position of every slot of a layout. Two seats with two centers keep cardPos; otherwise
+       seat 0 runs along the bottom, seat 1 along the top and seats 2 and 3 down the left and right
+       edges (overlapping if the window is short), with the centers in the middle and their piles below."""
+    if layout.classic_slots:
+        return list(cardPos)
+    w, h = card_size
+    positions = [None] * layout.num_slots
+    row = 6 * w + 5 * gap
+    step = min(h + gap, (height - 2 * gap - h) // 5)
+    edges = [
+        lambda i: ((width - row) // 2 + i * (w + gap), height - gap - h),     # bottom
+        lambda i: ((width - row) // 2 + i * (w + gap), gap),                  # top
+        lambda i: (gap, gap + i * step),                                      # left
+        lambda i: (width - gap - w, gap + i * step),                          # right
+    ]
+    for seat, hand in enumerate(layout.hand_slots):
+        for i, slot in enumerate((*hand, layout.hand_piles[seat])):
+            positions[slot] = edges[seat](i)
+    left = (width - layout.centers * (w + gap) + gap) // 2
+    for i, (slot, pile) in enumerate(layout.center_feeds):
+        x = left + i * (w + gap)
+        positions[slot] = (x, height // 2 - h - gap // 2)
+        positions[pile] = (x, height // 2 + gap // 2)
+    return positions
+
+
+def make_sprite(image, pos, **extra):
+    sprite = {
+        "image": image,
+        "rect": image.get_rect(topleft=pos),
+        "dragging": False,
+        "draggable": False,
+        "orig_pos": pos,
+        "is_back": False,
+    }
+    sprite.update(extra)
+    return sprite
+
+
+class TableView:
+    """placed_sprites (draw order) for a game, plus the card the player is dragging, if any."""
+
+    def __init__(self, game, cards, positions=cardPos, seat=0):
+        self.game = game
+        self.cards = cards                            # atlas / dict: card name or "cardback" -> Surface
+        self.positions = positions
+        # where the player sits depends on the layout: more centers push the hands to later slots
+        self.own_hand = game.layout.hand_slots[seat]  # the slots the player may drag from
+        self.own_pile = game.layout.hand_piles[seat]  # the pile the player draws from
+        num_slots = game.layout.num_slots
+        self.slot_cards = [EMPTY] * num_slots         # what each slot sprite currently shows
+        self.slot_sprites = [None] * num_slots        # None when the slot is empty
+        self.placed_sprites = []
+        self.dragged_sprite = None
+        self.grid = self.targets = None
+
+    def set_cards(self, cards, positions):
+        """Switch sprite set and positions (window resized). Every sprite is rebuilt on the next sync,
+           so call it while nothing is being dragged."""
+        self.cards = cards
+        self.positions = positions
+        self.slot_cards = [None] * len(self.slot_cards)   # matches no card
+        self.grid = self.targets = None
+
+    def build_grids(self):
+        """Slots never move, so their rects go in grids once: every slot for clicks, the centers for drops."""
+        w, h = self.cards["cardback"].get_size()
+        self.grid = SpatialGrid(max(w, h))
+        for slot, (x, y) in enumerate(self.positions):
+            self.grid.insert(slot, (x, y, w, h))
+        self.targets = SpatialGrid(max(w, h))
+        for side in self.game.layout.center_slots:
+            x, y = self.positions[side]
+            self.targets.insert(side, (x, y, w, h))
+
+    def sprite_at(self, pos):
+        """Topmost sprite under pos (not counting a dragged card), or None."""
+        if self.grid is None:
+            self.build_grids()
+        for slot in reversed(self.grid.at(pos)):
+            sprite = self.slot_sprites[slot]
+            if sprite is not None and sprite is not self.dragged_sprite:
+                return sprite
+        return None
+
+    def snap_target(self, center, radius):
+        """Center side whose card center is closest to center, if it's within radius; else None."""
+        if self.targets is None:
+            self.build_grids()
+        side, _ = self.targets.nearest(center, radius)
+        return side
+
+    def sync(self):
+        """Bring the slot sprites in line with the engine board. Only slots whose card changed get a new sprite;
+           a card the player is dragging is kept as is (and on top)."""
+        game, cards = self.game, self.cards
+        back_positions = game.layout.back_positions
+        for slot in range(len(self.slot_cards)):
+            if slot in back_positions:
+                card = BACK if game.pile_visible(slot) else EMPTY
+            else:
+                card = game.board[slot]
+            if card == self.slot_cards[slot]:
+                continue
+            self.slot_cards[slot] = card
+            if card == EMPTY:
+                self.slot_sprites[slot] = None
+            elif card == BACK:
+                self.slot_sprites[slot] = make_sprite(cards["cardback"], self.positions[slot], is_back=True, pile_index=slot)
+            else:
+                # only player hand slots are draggable by player
+                self.slot_sprites[slot] = make_sprite(cards[CARD_NAMES[card]], self.positions[slot], name=CARD_NAMES[card],
+                                                      draggable=slot in self.own_hand, slot=slot)
+        dragged = self.dragged_sprite
+        self.placed_sprites = [s for s in self.slot_sprites if s is not None and s is not dragged]
+        if dragged is not None:
+            self.placed_sprites.append(dragged)